@@ -2,24 +2,31 @@
 # -*- encoding: utf-8 -*-
 
 """ a text adventure game
+
+    Rooms of each dungeon level are generated from the game seed when first visited, so a dungeon can
+    be arbitrarily large and only explored rooms are kept in memory. A saved game stores the seed and
+    changes made since (visited rooms, picked up items, player's position and inventory).
 """
 
 import sys
-from random import randint, random
-from random import choice as randchoice
+import json
+from random import Random, randrange
 from collections import defaultdict
 from copy import copy
 
 from utils import Loop, Container, TextInput, first, sjoin, nl, space
-from board import StackableBoard, Loc, BaseTile
+from board import BaseBoard, StackableBoard, Loc, BaseTile, isstr
 
-commands      = dict(a="left", s="back", w="forward", d="right", p="pickup", i="inventory", m="map", l="look")
+commands      = dict(a="left", s="back", w="forward", d="right", p="pickup", i="inventory", m="map", l="look",
+                     v="save", r="restore")
 roomchance    = Container(door=0.8, shaky_floor=0.1)
 itemchance    = Container(Gem=0.1, Key=0.05, Gold=0.25, Anvil=0.01)
 itemchance    = Container(Gem=0.1, Key=0.1, Gold=0.1, Anvil=0.2)
 crystalchance = 0.1
 
 size          = 15
+seed          = None    # dungeon seed, random if None
+save_file     = "adv.sav"
 lhoriz        = '─'
 lvertical     = '│'
 doorchar      = '⌺'
@@ -64,36 +71,139 @@ class DirLoop(Loop):
 
 
 class AdvBoard(StackableBoard):
+    """ Dungeon level of `size` x `size` rooms, kept as a dict of stacks of visited locations; rooms
+        are generated from the seed and level number (see `rng()`), `taken` holds locations of rooms
+        where the item was picked up.
+    """
+    def __init__(self, size, def_tile, seed=None, **kwargs):
+        BaseBoard.__init__(self, size, **kwargs)
+        self.board_initialized = True
+        self._def_tile_str     = isstr(def_tile)
+        self.def_tile          = def_tile
+        self.seed              = randrange(2**32) if seed is None else seed
+        self.level             = 0
+        self.reset()
+
+    def reset(self):
+        self.stacks = {}
+        self.taken  = set()
+        self.map    = MapCache(self)
+
+    def next_level(self):
+        self.level += 1
+        self.reset()
+
+    def rng(self, *key):
+        """Random generator for `key` on current level of this dungeon; always gives the same numbers."""
+        return Random(sjoin((self.seed, self.level) + key))
+
+    def items(self, tile_loc):
+        loc = self.ploc(tile_loc)
+        if loc not in self.stacks:
+            self.stacks[loc] = [self.make_tile(loc)]
+        return self.stacks[loc]
+
+    def __getitem__(self, loc):
+        stack = self.stacks.get(loc)
+        return stack[-1] if stack else self.make_tile(loc)
+
+    def __setitem__(self, tile_loc, item):
+        self.items(tile_loc).append(item)
+        self.map.update(self.ploc(tile_loc))
+
+    def __delitem__(self, tile_loc):
+        del self.items(tile_loc)[-1]
+        self.map.update(self.ploc(tile_loc))
+
+    def move(self, tile_loc, newloc):
+        loc = self.ploc(tile_loc)
+        super(AdvBoard, self).move(tile_loc, newloc)
+        self.map.update(loc)
+
+    def nextloc(self, tile_loc, dir, n=1, wrap=False):
+        loc = self.ploc(tile_loc)
+        loc = Loc(loc.x + dir.x*n, loc.y + dir.y*n)
+        return loc if self.valid(loc) else None
+
     def nlocs(self, loc):
         x, y = loc
         locs = ((x, y-1), (x+1, y), (x, y+1), (x-1, y))
         locs = [Loc(*tup) for tup in locs]
         return [(loc if self.valid(loc) else None) for loc in locs]
 
+    def door(self, loc, dir):
+        """ Is there a door in `dir` wall of room at `loc`? Doors are generated per wall, so both rooms
+            on either side of it agree without the other one being generated.
+        """
+        nloc = self.nlocs(loc)[dir]
+        if not nloc:
+            return False
+        wall = loc if dir in (1, 2) else nloc       # east and south walls are keyed by the room west / north of them
+        return self.rng(wall.x, wall.y, dir % 2).random() < roomchance.door
+
+    def room(self, loc):
+        """Return room at `loc`, generating it on first visit."""
+        return self.get_instance(Room, loc) if loc in self.stacks else Room(loc)
+
     def center(self):
         return Loc(self.width // 2, self.height // 2)
 
 
+class MapCache(object):
+    """ Map of visited rooms within their bounding box, as a list of lines; locations changed since the
+        last `render()` are updated in place and only their lines are joined again.
+    """
+    def __init__(self, board):
+        self.board   = board
+        self.box     = None     # x1, y1, x2, y2
+        self.cells   = []
+        self.lines   = []
+        self.changed = set()
+
+    def update(self, loc):
+        self.changed.add(loc)
+
+    def render(self):
+        if not self.changed:
+            return self.lines
+
+        B, box  = self.board, self.box
+        xs, ys  = [l.x for l in self.changed], [l.y for l in self.changed]
+        if box:
+            xs.extend(box[::2]); ys.extend(box[1::2])
+        newbox  = min(xs), min(ys), max(xs), max(ys)
+
+        if newbox != box:
+            x1, y1, x2, y2 = self.box = newbox
+            self.cells = [[str(B[Loc(x, y)]) for x in range(x1, x2+1)] for y in range(y1, y2+1)]
+            self.lines = [None] * len(self.cells)
+            rows       = range(len(self.cells))
+        else:
+            x1, y1 = box[:2]
+            rows   = set()
+            for loc in self.changed:
+                self.cells[loc.y - y1][loc.x - x1] = str(B[loc])
+                rows.add(loc.y - y1)
+
+        for n in rows:
+            self.lines[n] = space + sjoin(self.cells[n])
+        self.changed.clear()
+        return self.lines
+
+
 class Room(object):
     def __init__(self, loc):
+        rng              = board.rng(loc.x, loc.y)
+        item             = genitem(rng, board.level)
         self.loc         = loc
-        self.doors       = list(self.gendoors())
-        self.item        = genitem()
-        self.shaky_floor = bool(random() < roomchance.shaky_floor)
+        self.doors       = [board.door(loc, d) for d in absdirs]
+        self.item        = None if loc in board.taken else item
+        self.shaky_floor = bool(rng.random() < roomchance.shaky_floor)
         board[loc]       = self
 
     def __str__(self):
         return roomchar
 
-    def gendoors(self):
-        inverse_dirs = (2,3,0,1)
-        for rd, nd, nloc in zip(absdirs, inverse_dirs, board.nlocs(self.loc)):
-            if not nloc:
-                yield False
-            else:
-                room = board.get_instance(Room, nloc)
-                yield bool( (random()<roomchance.door or room and room.doors[nd]) )
-
     def show_doors(self, doors):
         d     = "%s"
         h, v  = lhoriz, lvertical
@@ -114,6 +224,10 @@ class PlayerDir(object):
         self.dir.cw(dirnum)
         self.absdir = DirLoop(board.dirlist).cw(self.dir.dir)
 
+    def set(self, dirnum):
+        self.dir.cw((dirnum - self.dir.dir) % len(absdirs))
+        self.update()
+
     def update_doors(self):
         self.doors  = DirLoop(copy(self.player.room.doors))
         self.doors.rotate_cw(self.dir.dir)
@@ -131,6 +245,8 @@ class Msg(object):
     pickedup     = "You pick up %s."
     shfloor      = "This room appears to have a shaky floor."
     ent_room     = "You enter a room."
+    saved        = "Game saved."
+    no_save      = "No saved game found."
     fall_through = "The floor can no longer hold your weight and starts breaking up into pieces; " \
                    "you fall down through the floor."
 
@@ -160,7 +276,7 @@ class Player(object):
         M = [Msg.ent_room]    # messages for the player
         self.dir.update(ndir)
         newloc    = board.nextloc(self, self.dir.absdir)
-        self.room = Room(newloc) if board.empty(newloc) else board[newloc]
+        self.room = board.room(newloc)
 
         board.move(self, newloc)
         self.dir.update_doors()
@@ -173,12 +289,11 @@ class Player(object):
 
     def next_level(self, messages):
         messages.append(Msg.fall_through)
-        board.reset()
+        board.next_level()
 
-        self.room             = Room(board.center())
-        self.loc              = self.room.loc
-        board[self.loc]       = self
-        itemchance["Crystal"] = crystalchance
+        self.room       = Room(board.center())
+        self.loc        = self.room.loc
+        board[self.loc] = self
 
     def forward(self) : self.move(0)
     def right(self)   : self.move(1)
@@ -191,6 +306,7 @@ class Player(object):
             self.items[item] += 1
             print(Msg.pickedup % item)
             self.room.item = None
+            board.taken.add(self.room.loc)
 
             if item.crystal:
                 print(Msg.win)
@@ -234,7 +350,43 @@ class Player(object):
             messages.append(msg)
 
     def map(self):
-        board.draw()
+        print(nl.join(board.map.render()))
+
+    def save(self):
+        """Save the seed and changes made to the dungeon since it was generated."""
+        data = dict(seed    = board.seed,
+                    level   = board.level,
+                    visited = [loc.loc for loc in board.stacks],
+                    taken   = [loc.loc for loc in board.taken],
+                    loc     = self.loc.loc,
+                    dir     = self.dir.dir.dir,
+                    items   = dict((item.name, n) for item, n in self.items.items()))
+        with open(save_file, 'w') as fp:
+            json.dump(data, fp)
+        print(Msg.saved)
+
+    def restore(self):
+        global board, player
+        try:
+            with open(save_file) as fp:
+                data = json.load(fp)
+        except (IOError, OSError, ValueError):
+            print(Msg.no_save)
+            return
+
+        board       = AdvBoard(size, space, data["seed"], screen_sep=0)
+        board.level = data["level"]
+        board.taken = set(Loc(*loc) for loc in data["taken"])
+        for loc in data["visited"]:
+            Room(Loc(*loc))
+
+        player = Player(board.get_instance(Room, Loc(*data["loc"])))
+        player.dir.set(data["dir"])
+        player.dir.update_doors()
+        Player.items.clear()
+        for name, n in data["items"].items():
+            Player.items[globals()[name]()] = n
+        player.look()
 
 
 class Adv(object):
@@ -246,13 +398,15 @@ class BasicInterface(object):
         player.look()
 
         while True:
-            cmd = TextInput("(a|s|w|d|p|i|m|l)").getval()
+            cmd = TextInput("(%s)" % sjoin(commands, '|')).getval()
             getattr(player, commands[cmd])()
 
 
-def genitem():
-    for name, chance in itemchance.items():
-        if chance >= random():
+def genitem(rng, level):
+    """Generate item using `rng` random generator; the Crystal is only found below the first level."""
+    chances = list(itemchance.items()) + ([("Crystal", crystalchance)] if level else [])
+    for name, chance in chances:
+        if chance >= rng.random():
             return globals()[name]()
 
 def a_an(item):
@@ -260,7 +414,7 @@ def a_an(item):
 
 
 if __name__ == "__main__":
-    board  = AdvBoard(size, space, screen_sep=0)
+    board  = AdvBoard(size, space, seed, screen_sep=0)
     room   = Room(board.center())
     player = Player(room)
     BasicInterface().run()
@@ -8,6 +8,7 @@ from itertools import cycle
 
 from utils import TextInput, AttrToggles, range1, nextval, first, nl
 from board import Board, BaseTile
+from battleship_ai import HeatMapAI
 
 size       = 5, 5
 num_ships  = 3
@@ -21,6 +22,7 @@ padding    = 2, 1
 
 players    = [1, 2]
 ai_players = [1, ]
+ai_type    = "heatmap"  # "heatmap" for probability density targeting, "random" for random shots
 divider    = '-' * (size[0] * 4 + 6)
 
 
@@ -44,8 +46,8 @@ class Ship(Tile)  : char = shipchar
 
 
 class BattleshipBoard(Board):
-    def random_blank(self) : return rndchoice(self.tiles("blank"))
-    def random_unhit(self) : return rndchoice(self.tiles_not("is_hit"))
+    def random_blank(self) : return self[self.random_loc("blank")]
+    def random_unhit(self) : return self[self.random_loc_not("is_hit")]
 
     def next_validloc(self, start, dir, n):
         loc = self.nextloc(start, dir, n)
@@ -68,7 +70,8 @@ class Player(object):
         """Create player's board and randomly place `num_ships` ships on it."""
         self.num   = num
         self.ai    = bool(num in ai_players)
-        self.board = BattleshipBoard(size, Blank, num_grid=True, padding=padding, pause_time=0, screen_sep=0)
+        self.board = BattleshipBoard(size, Blank, index=("blank", "ship", "is_hit"), num_grid=True,
+                                     padding=padding, pause_time=0, screen_sep=0)
         B          = self.board
 
         for ship in range1(num_ships):
@@ -78,6 +81,8 @@ class Player(object):
         if not self.ai:
             for tile in B: tile.revealed = True
 
+        self.targeting = HeatMapAI(B.width, B.height, range1(num_ships))
+
     def enemy(self): return nextval(players, self)
 
 
@@ -115,8 +120,10 @@ class BasicInterface(object):
         return player.enemy().board[ self.textinput.getloc() ]
 
     def ai_move(self, player):
-        """Very primitive 'AI', always hits a random location."""
-        return player.enemy().board.random_unhit()
+        """Fire using probability density targeting, or at a random location if `ai_type` is random."""
+        board = player.enemy().board
+        if ai_type == "heatmap" : return player.targeting.fire(board)
+        else                    : return board.random_unhit()
 
 
 if __name__ == "__main__":
@@ -5,14 +5,17 @@ import sys
 from random import choice as rndchoice
 from itertools import cycle
 
-from utils import Loop, TextInput, range1, first, nl
-from board import Board, BaseTile
+from utils import Loop, TextInput, range1, first
+from board import Board, BaseTile, GameOver
+from bblocks_ai import BlocksState, Lookahead
 
 size        = 5
 pause_time  = 0.2
 players     = {1: "➀➁➂➃", 2: "➊➋➌➍"}
 ai_players  = [1, ]
-check_moves = 15
+ai_types    = {1: "lookahead", 2: "lookahead"}   # "lookahead" or "greedy"
+ai_depth    = 2         # plies searched by lookahead AI
+check_moves = 15        # check for end of game every N steps of a chain reaction
 padding     = 2, 1
 
 
@@ -24,15 +27,7 @@ class Tile(BaseTile):
         else           : return str(self.num)
 
     def increment(self, player):
-        """ Increment tile number; if number wraps, increment neighbour tiles.
-            `bblocks.counter` is used to avoid infinite recursion loops.
-        """
-        if not bblocks.counter.next(): bblocks.check_end(player)
-
-        if self._increment(player):
-            for tile in board.cross_neighbours(self):
-                tile.increment(player)
-            board.draw()
+        board.increment(self, player)
 
     def _increment(self, player):
         self.player = player
@@ -49,7 +44,29 @@ class BlocksBoard(Board):
             tile.maxnum = len( [self.valid(nbloc) for nbloc in neighbours(tile)] )
             tile.num    = Loop(range1(tile.maxnum))
 
+    def increment(self, tile, player):
+        """ Increment tile number; if number wraps, increment neighbour tiles, using a work queue of
+            tiles to increment. Once a player has all tiles the chain reaction can go on in circles,
+            so end of game is checked every `check_moves` steps.
+        """
+        queue, steps = [tile], 0
+        while queue:
+            steps += 1
+            if not steps % check_moves: bblocks.check_end(player)
+
+            tile = queue.pop()
+            if tile._increment(player):
+                queue.extend(self.cross_neighbours(tile))
+                self.draw()
+
     def ai_move(self, player):
+        if ai_types[player] == "lookahead":
+            opponent = first(p for p in players if p != player)
+            i        = Lookahead(ai_depth).best_move(BlocksState(self), player, opponent)
+            return self[self.geometry.locs[i]]
+        return self.greedy_move(player)
+
+    def greedy_move(self, player):
         """Randomly choose between returning the move closest to completing a tile or a random move."""
         tiles = [t for t in self if self.valid_move(player, t)]
 
@@ -63,14 +80,12 @@ class BlocksBoard(Board):
 
 class BlockyBlocks(object):
     winmsg  = "player %s wins!"
-    counter = Loop(range(check_moves))
 
     def check_end(self, player):
         """Check if game is finished."""
         if all(tile.player==player for tile in board):
             board.draw()
-            print(nl, self.winmsg % player)
-            sys.exit()
+            board.game_over(self.winmsg % player, winner=player)
 
 
 class Test(object):
@@ -90,9 +105,21 @@ class Test(object):
             else                                    : print(self.textinput.invalid_move)
 
 
-if __name__ == "__main__":
-    board   = BlocksBoard(size, Tile, num_grid=True, padding=padding, pause_time=pause_time)
+def new_game(**kwargs):
+    global board, bblocks
+    board   = BlocksBoard(size, Tile, num_grid=True, padding=padding, pause_time=pause_time, **kwargs)
     bblocks = BlockyBlocks()
 
+def run_headless():
+    """Play one game between AI players without drawing; return the result (see `board.GameOver`)."""
+    global ai_players
+    ai_players = list(players.keys())
+    new_game(headless=True)
+    try                  : Test().run()
+    except GameOver as e : return e.result
+
+
+if __name__ == "__main__":
+    new_game()
     try: Test().run()
     except KeyboardInterrupt: sys.exit()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+
+""" Lookahead AI for Blocky Blocks.
+
+    `BlocksState` is a flat copy of the board (tile numbers and owners in lists indexed by flat
+    location index) where a move is made by running the chain reaction through an explicit work
+    queue, recording old values of changed tiles so the move can be taken back (make / unmake);
+    the board is never copied during the search. Tile explosions commute, so the queue order gives
+    the same result as the recursive flood fill of the game.
+
+    Run as a script to play a headless tournament between AI strategies, each strategy playing both
+    first and second:  bblocks_ai.py [num_games] [strategy1 strategy2]
+"""
+
+import sys
+from random import choice as rndchoice
+
+win_score = 10000
+max_chain = 10000   # stop a chain reaction after this many steps, if it never ends
+
+
+class BlocksState(object):
+    def __init__(self, board):
+        self.cross  = board.geometry.cross
+        self.maxnum = [t.maxnum for t in board]
+        self.nums   = [t.num.item for t in board]
+        self.owner  = [t.player or 0 for t in board]
+        self.size   = len(self.nums)
+        self.owned  = {}
+        for p in self.owner:
+            self.owned[p] = self.owned.get(p, 0) + 1
+
+    def moves(self, player):
+        owner = self.owner
+        return [i for i in range(self.size) if owner[i] in (0, player)]
+
+    def won(self, player):
+        return self.owned.get(player, 0) == self.size
+
+    def make(self, i, player):
+        """Increment tile `i` for `player` and run the chain reaction; return undo list."""
+        nums, owner, maxnum, cross, owned = self.nums, self.owner, self.maxnum, self.cross, self.owned
+        undo, queue = [], [i]
+
+        while queue and len(undo) < max_chain:
+            j = queue.pop()
+            undo.append( (j, nums[j], owner[j]) )
+
+            if owner[j] != player:
+                owned[owner[j]] -= 1
+                owned[player]    = owned.get(player, 0) + 1
+                owner[j]         = player
+                if owned[player] == self.size:
+                    break
+
+            if nums[j] == maxnum[j]:
+                nums[j] = 1
+                queue.extend(cross[j])
+            else:
+                nums[j] += 1
+        return undo
+
+    def unmake(self, undo):
+        nums, owner, owned = self.nums, self.owner, self.owned
+        for j, num, player in reversed(undo):
+            if owner[j] != player:
+                owned[owner[j]] -= 1
+                owned[player]    = owned.get(player, 0) + 1
+            nums[j], owner[j] = num, player
+
+    def evaluate(self, player, opponent):
+        """Owned tiles difference; tiles one step from exploding count a little extra."""
+        nums, owner, maxnum = self.nums, self.owner, self.maxnum
+        score = 4 * (self.owned.get(player, 0) - self.owned.get(opponent, 0))
+        for i in range(self.size):
+            if nums[i] == maxnum[i]:
+                if owner[i] == player     : score += 1
+                elif owner[i] == opponent : score -= 1
+        return score
+
+
+class Lookahead(object):
+    """Negamax search `depth` plies ahead; ties between best moves are broken randomly."""
+    def __init__(self, depth=2):
+        self.depth = depth
+
+    def negamax(self, state, player, opponent, depth):
+        if depth == 0:
+            return state.evaluate(player, opponent)
+
+        best = -win_score - 1
+        for i in state.moves(player):
+            undo  = state.make(i, player)
+            value = win_score + depth if state.won(player) else \
+                    -self.negamax(state, opponent, player, depth-1)
+            state.unmake(undo)
+            best = max(best, value)
+        return best
+
+    def best_move(self, state, player, opponent):
+        """Return flat index of the best move."""
+        scores = {}
+        for i in state.moves(player):
+            undo      = state.make(i, player)
+            scores[i] = win_score + self.depth if state.won(player) else \
+                        -self.negamax(state, opponent, player, self.depth-1)
+            state.unmake(undo)
+
+        best = max(scores.values())
+        return rndchoice([i for i, s in scores.items() if s == best])
+
+
+def tournament(strategies, games):
+    """Play `games` games in each seating of two `strategies`; return dict of wins by strategy, elapsed time."""
+    import headless
+
+    wins, elapsed = dict.fromkeys(strategies, 0), 0
+    for first, second in (strategies, strategies[::-1]):
+        setting  = ("ai_types", {1: first, 2: second})
+        results, sec = headless.run("bblocks", games, [setting])
+        elapsed += sec
+        for r in results:
+            wins[first if r.winner == 1 else second] += 1
+    return wins, elapsed
+
+
+if __name__ == "__main__":
+    args       = sys.argv[1:]
+    games      = int(args[0]) if args else 500
+    strategies = tuple(args[1:3]) if len(args) > 2 else ("lookahead", "greedy")
+
+    wins, elapsed = tournament(strategies, games)
+    total         = 2 * games
+    for name in strategies:
+        print("%-10s %5.1f%% wins" % (name, 100.0 * wins[name] / total))
+    print("%d games in %.2fs, %.1f games/s" % (total, elapsed, total / elapsed))
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+
+""" Compare memory use and iteration speed of the old dict-based `Loc` (allocated fresh for every
+    step) against the __slots__ based `Loc`, created per step and interned by `board.Geometry`.
+"""
+
+import tracemalloc
+from timeit import repeat
+
+from board import Board, BaseTile, Loc
+
+size   = 200, 200
+number = 5
+repeats = 5      # best of repeats is reported
+
+
+class DictLoc(object):
+    """The old `Loc` implementation: coordinates are stored three times in a per-instance __dict__."""
+    def __init__(self, x, y):
+        self.loc = x, y
+        self.x, self.y = x, y
+
+    def __hash__(self)        : return hash(self.loc)
+    def __eq__(self, other)   : return self.loc == getattr(other, "loc", None)
+
+
+def allocated(make_locs):
+    """Return number of allocated blocks and bytes retained by locations created by `make_locs()`."""
+    tracemalloc.start()
+    snap1 = tracemalloc.take_snapshot()
+    locs  = make_locs()
+    snap2 = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats = snap2.compare_to(snap1, "filename")
+    return sum(s.count_diff for s in stats), sum(s.size_diff for s in stats), len(locs)
+
+
+def main():
+    board = Board(size, BaseTile)
+    board.init_board()
+    width, height = size
+    xrng, yrng    = range(width), range(height)
+
+    def old_locs() : return [DictLoc(x, y) for y in yrng for x in xrng]
+    def new_locs() : return [board.loc(x, y) for y in yrng for x in xrng]
+    board.geometry      # build the interning pool before measuring
+
+    print("board: %dx%d" % size)
+    print("%-28s %10s %12s" % ('', "blocks", "bytes"))
+    print("%-28s %10d %12d" % (("dict Loc per step",) + allocated(old_locs)[:2]))
+    print("%-28s %10d %12d" % (("interned Loc",) + allocated(new_locs)[:2]))
+
+    def old_iter():
+        for y in yrng:
+            for x in xrng:
+                board[DictLoc(x, y)]
+
+    def new_iter():
+        for tile in board: pass
+
+    def fresh_loc_iter():
+        for y in yrng:
+            for x in xrng:
+                board[Loc(x, y)]
+
+    print()
+    for name, fn in (("dict Loc per step", old_iter), ("slots Loc per step", fresh_loc_iter),
+                     ("interned Loc", new_iter)):
+        sec = min(repeat(fn, number=number, repeat=repeats)) / number
+        print("%-28s %8.1f ms/pass  %6.2fM cells/s" % (name, sec*1000, width*height / sec / 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+
+""" Benchmark headless robot battles: play `num_games` games of `robots.py` with a randomly programmed
+    player in this process, then across a process pool, and report win rates and speed.
+
+    usage: bench_robots.py [num_games]
+"""
+
+import sys
+import random
+from time import time
+
+import robots
+import headless
+
+num_games = 10000
+
+
+def serial(num):
+    start   = time()
+    results = []
+    for seed in range(num):
+        random.seed(seed)
+        results.append(robots.run_headless())
+    return results, time() - start
+
+
+if __name__ == "__main__":
+    num = int(sys.argv[1]) if len(sys.argv) > 1 else num_games
+    headless.report("robots (1 process)", *serial(num))
+    headless.report("robots (pool)", *headless.run("robots", num))
@@ -5,8 +5,8 @@ import sys
 from random import choice as randchoice
 from random import randint, random
 
-from utils import range1, TextInput, sjoin, first, space, nl
-from board import Board, BaseTile
+from utils import range1, TextInput, sjoin, first, space
+from board import Board, BaseTile, GameOver
 
 size           = 8, 6
 player_chars   = '⎔▣'
@@ -26,6 +26,7 @@ star_defence   = 0.6    # star defense rating: degree of advantage for defenders
 production_rng = 8, 12  # range of star production, ships per cycle
 send_chance    = 0.4    # chance of sending a fleet, used by AI
 send_cutoff    = 25     # only send a fleet if have >=N, used by AI
+max_turns      = None   # end the game in a draw after N turns
 
 
 class PlayerBase(object):
@@ -135,6 +136,7 @@ class Player(PlayerBase):
 
 class Betelgeuse(object):
     winmsg            = "Player %s wins!"
+    drawmsg           = "No winner after %d turns."
     turn              = 1
     show_ships_player = None
 
@@ -143,8 +145,10 @@ class Betelgeuse(object):
 
         if len(pchars) == 1:
             board.draw()
-            print(nl, self.winmsg % first(pchars))
-            sys.exit()
+            board.game_over(self.winmsg % first(pchars), winner=first(pchars), turns=self.turn)
+        elif max_turns and self.turn > max_turns:
+            board.draw()
+            board.game_over(self.drawmsg % max_turns, winner=None, turns=self.turn)
 
 
 class BasicInterface(object):
@@ -185,8 +189,9 @@ class BasicInterface(object):
         return src, goal, ships
 
 
-if __name__ == "__main__":
-    board      = BetelgeuseBoard(size, Blank, padding=padding, pause_time=pause_time)
+def new_game(**kwargs):
+    global board, betelgeuse, fleets, stars, players
+    board      = BetelgeuseBoard(size, Blank, padding=padding, pause_time=pause_time, **kwargs)
     betelgeuse = Betelgeuse()
     fleets     = []
     stars      = [Star(board.random_blank(), n) for n in range1(num_stars)]
@@ -195,5 +200,17 @@ if __name__ == "__main__":
     for n, player in enumerate(players):
         stars[n].char = player.char
 
+def run_headless():
+    """Play one game between AI players without drawing; return the result (see `board.GameOver`)."""
+    global ai_players, max_turns
+    ai_players = player_chars
+    max_turns  = max_turns or 1000
+    new_game(headless=True)
+    try                  : BasicInterface().run()
+    except GameOver as e : return e.result
+
+
+if __name__ == "__main__":
+    new_game()
     try: BasicInterface().run()
     except KeyboardInterrupt: sys.exit()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+
+""" Headless simulation core for Betelgeuse, for tuning the AI policy.
+
+    Stars are kept in parallel arrays (owner, ships, production) with a precomputed travel time table
+    and per-star list of other stars ordered by distance. Fleets in flight are kept in buckets by
+    arrival turn, so each turn only touches the fleets that arrive. Production is applied to all stars
+    at once every `star_turns` turns, and a battle is resolved by drawing the number of attacking
+    ships lost between defender losses from a geometric distribution instead of rolling for every
+    ship; results follow the same rules as `betelgeuse.py` (`star_defence`, `production_rng`, ...).
+
+    Run as a script to sweep `send_chance` and `send_cutoff` of the first player against the default
+    policy of the second player across a process pool:
+
+        betelgeuse_sim.py [num_games] [chances] [cutoffs]
+
+    e.g. `betelgeuse_sim.py 200 0.2,0.4,0.6 10,25,40`
+"""
+
+import sys
+import math
+from array import array
+from time import time
+from random import random, randint, sample, seed as rndseed
+from multiprocessing import Pool
+
+import betelgeuse as game
+from utils import Container
+
+neutral   = -1
+num_games = 200
+
+
+class Simulation(object):
+    """ One game between AI players; `policies` is a list of (send_chance, send_cutoff), one per player;
+        game settings are read from `betelgeuse` module.
+    """
+    def __init__(self, policies, max_turns=None):
+        width, height  = game.size
+        self.policies  = policies
+        self.max_turns = max_turns or game.max_turns or 1000
+        self.turn      = 1
+        self.arrivals  = {}     # turn: list of (owner, target star, ships)
+        self.in_flight = [0] * len(policies)
+
+        locs            = [divmod(i, width)[::-1] for i in sample(range(width * height), game.num_stars)]
+        num             = len(locs)
+        self.owner      = array('b', [neutral] * num)
+        self.ships      = array('l', [0] * num)
+        self.production = array('l', [randint(*game.production_rng) for _ in range(num)])
+        for p in range(len(policies)):
+            self.owner[p] = p
+
+        dist         = [[math.sqrt((x2-x1)**2 + (y2-y1)**2) for x2, y2 in locs] for x1, y1 in locs]
+        self.travel  = [[int(round(d / 2)) for d in row] for row in dist]
+        self.nearest = [sorted((j for j in range(num) if j != i), key=row.__getitem__)
+                        for i, row in enumerate(dist)]
+
+    def send(self, player, star, target, ships):
+        self.ships[star] -= ships
+        self.in_flight[player] += 1
+        arrival = self.turn + self.travel[star][target]
+        self.arrivals.setdefault(arrival, []).append((player, target, ships))
+
+    def ai_moves(self, player):
+        chance, cutoff = self.policies[player]
+        owner, ships   = self.owner, self.ships
+        moves          = []
+
+        for star in range(len(owner)):
+            if owner[star] == player and random() < chance and ships[star] >= cutoff:
+                target = next((t for t in self.nearest[star] if owner[t] != player), None)
+                if target is not None:
+                    moves.append( (star, target, randint(ships[star] // 2, ships[star])) )
+        for move in moves:
+            self.send(player, *move)
+
+    def produce(self):
+        owner, ships, production = self.owner, self.ships, self.production
+        for star in range(len(owner)):
+            ships[star] += production[star] if owner[star] != neutral else production[star] // 2
+
+    def battle(self, attackers, defenders):
+        """Return (attackers left, defenders left); one of them is 0."""
+        if not attackers:
+            return 0, defenders
+        q = game.star_defence       # chance that the attacker loses a ship in each round
+        if not q:
+            return attackers, 0
+        if q >= 1:
+            # attacker loses every round, as in `Fleet.attack()` where random() > 1.0 never happens
+            return (0, defenders) if defenders else (attackers, 0)
+        logq = math.log(q)
+        lost = 0
+        for killed in range(defenders):
+            lost += int(math.log(1.0 - random()) / logq)
+            if lost >= attackers:
+                return 0, defenders - killed
+        return attackers - lost, 0
+
+    def arrive(self):
+        owner, ships = self.owner, self.ships
+        for player, star, num in self.arrivals.pop(self.turn, ()):
+            self.in_flight[player] -= 1
+            if owner[star] == player:
+                ships[star] += num
+                continue
+
+            left, ships[star] = self.battle(num, ships[star])
+            if left:
+                owner[star], ships[star] = player, left
+
+    def winner(self):
+        """Return winning player, None if the game is not over yet."""
+        alive = set(o for o in self.owner if o != neutral)
+        alive.update(p for p, n in enumerate(self.in_flight) if n)
+        if len(alive) == 1:
+            return alive.pop()
+
+    def run(self):
+        """Play the game; return Container with `winner` (player number or None for a draw) and `turns`."""
+        players = range(len(self.policies))
+        while True:
+            for player in players:
+                self.ai_moves(player)
+                winner = self.winner()
+                if winner is not None:
+                    return Container(winner=winner, turns=self.turn)
+                if self.turn > self.max_turns:
+                    return Container(winner=None, turns=self.turn)
+
+            if self.turn % game.star_turns == 0:
+                self.produce()
+            self.arrive()
+            self.turn += 1
+
+
+def play(args):
+    """Play one game with `policies` and random `seed`; return the result."""
+    policies, seed = args
+    rndseed(seed)
+    return Simulation(policies).run()
+
+def sweep(chances, cutoffs, games=num_games, processes=None):
+    """ Play `games` games for each (chance, cutoff) policy of player 0 against the default policy of
+        player 1; return dict of policy: win rate of player 0, and elapsed time.
+    """
+    start    = time()
+    default  = game.send_chance, game.send_cutoff
+    grid     = [(c, k) for c in chances for k in cutoffs]
+    jobs     = [([policy, default], n) for policy in grid for n in range(games)]
+    pool     = Pool(processes)
+    try:
+        results = pool.map(play, jobs, chunksize=max(1, len(jobs) // 256))
+    finally:
+        pool.close()
+
+    rates = {}
+    for n, policy in enumerate(grid):
+        wins = sum(1 for r in results[n*games : (n+1)*games] if r.winner == 0)
+        rates[policy] = wins / float(games)
+    return rates, time() - start
+
+
+if __name__ == "__main__":
+    args    = sys.argv[1:]
+    games   = int(args[0]) if args else num_games
+    chances = [float(c) for c in args[1].split(',')] if len(args) > 1 else (0.2, 0.4, 0.6, 0.8)
+    cutoffs = [int(c) for c in args[2].split(',')] if len(args) > 2 else (10, 25, 40)
+
+    rates, elapsed = sweep(chances, cutoffs, games)
+    print("win rate vs. send_chance=%s send_cutoff=%s" % (game.send_chance, game.send_cutoff))
+    print("chance  " + ''.join("%8d" % k for k in cutoffs))
+    for c in chances:
+        print("%6.2f  " % c + ''.join("%7.1f%%" % (100 * rates[c, k]) for k in cutoffs))
+    print("%d games in %.2fs, %.0f games/s" % (len(rates) * games, elapsed, len(rates) * games / elapsed))
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+
+""" Bitboards for Versi-like games.
+
+    Each player's pieces are kept in an int bitmask, bit `y*width + x` set for each piece; for boards
+    up to 8x8 these fit in 64 bits, larger boards simply use bigger (arbitrary precision) ints.
+    Valid moves and captured pieces are found by shifting masks in the eight directions, so a full
+    move generation is a few dozen integer operations instead of a ray scan from every location.
+"""
+
+from board import geometry
+from utils import lastind
+
+
+class BitBoard(object):
+    """Shift-based move generation and capture computation on bitmasks for a `width` x `height` board."""
+    dirs = [(0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1)]
+
+    def __init__(self, width, height):
+        self.width  = width
+        self.height = height
+        self.full   = (1 << width*height) - 1
+
+        col0 = colx = 0
+        for y in range(height):
+            col0 |= 1 << y*width
+            colx |= 1 << y*width + lastind(width)
+
+        # for each direction: shift amount and mask to clear bits that wrapped around to the other side
+        self.shifts = []
+        for dx, dy in self.dirs:
+            mask = self.full
+            if dx > 0 : mask &= ~col0
+            if dx < 0 : mask &= ~colx
+            self.shifts.append((dy*width + dx, mask))
+        self.maxrun = max(width, height) - 2
+
+    def shift(self, mask, n, edge):
+        return ((mask << n) if n > 0 else (mask >> -n)) & edge
+
+    def moves(self, own, opp):
+        """Return mask of valid moves for `own` player against `opp`."""
+        empty = self.full & ~(own | opp)
+        moves = 0
+        shift = self.shift
+
+        for n, edge in self.shifts:
+            run = shift(own, n, edge) & opp
+            for _ in range(self.maxrun - 1):
+                run |= shift(run, n, edge) & opp
+            moves |= shift(run, n, edge) & empty
+        return moves & empty
+
+    def captured(self, own, opp, move):
+        """Return mask of `opp` pieces captured by `own` playing at `move` bit; 0 if move is not valid."""
+        if (own | opp) & move:
+            return 0
+        shift    = self.shift
+        captured = 0
+
+        for n, edge in self.shifts:
+            run = 0
+            bit = shift(move, n, edge)
+            while bit & opp:
+                run |= bit
+                bit = shift(bit, n, edge)
+            if bit & own:
+                captured |= run
+        return captured
+
+    def play(self, own, opp, move):
+        """Return new (own, opp) masks after `own` plays at `move` bit."""
+        captured = self.captured(own, opp, move)
+        return own | move | captured, opp & ~captured
+
+    def bit(self, loc):
+        return 1 << (loc.y*self.width + loc.x)
+
+    def bits(self, mask):
+        """Generate indexes of set bits in `mask`, lowest first."""
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+    def locs(self, mask):
+        locs = geometry(self.width, self.height).locs
+        return [locs[i] for i in self.bits(mask)]
+
+    def count(self, mask):
+        return bin(mask).count('1')
@@ -1,59 +1,419 @@
 from __future__ import print_function, unicode_literals, division
+import sys
 import math
+from random import choice as rndchoice
 from time import sleep
+from array import array
 
-from utils import ujoin, range1, enumerate1, first, nl, space
+from utils import Container, ujoin, range1, enumerate1, first, nl, space
+from render import DiffRenderer
+
+diff_render = False     # default for boards: redraw only changed tiles, see `render.DiffRenderer`
+record_file = None      # record changes of the first board created and text input to this file, see `replay.py`
+record_seed = None      # random seed of the recorded game; random if None
+
+
+class GameOver(Exception):
+    """Raised at the end of a headless game; `result` is a Container with game-specific results."""
+    def __init__(self, result) : self.result = result
+    def __str__(self)          : return repr(dict(self.result.items()))
 
 
 class BaseTile(object):
     """ Base tile that sets a convenience attribute according to the name of the class, e.g. Blank
         will have tile.blank=True set automatically.
     """
+    tile_index = None
+
     def __init__(self, loc=None):
         self.loc = loc
         setattr(self, self.__class__.__name__.lower(), True)
 
 
 class Loc(object):
-    """ Location on game board; note that we should not modify the location in place to avoid many
-        hard to track errors; `moved()` creates and returns a new instance.
+    """ Location on game board; locations should not be modified in place to avoid many hard to track
+        errors; `moved()` creates and returns a new instance.
+
+        Boards keep a pool of interned locations per geometry (see `Geometry.loc()`), so that iterating
+        over the board does not allocate a new location for every step; these are `InternedLoc`
+        instances, which are shared and therefore enforce immutability.
     """
+    __slots__ = ("x", "y")
+
     def __init__(self, x, y):
-        self.loc = x, y
-        self.x, self.y = x, y
+        self.x = x
+        self.y = y
+
+    @property
+    def loc(self):
+        return self.x, self.y
 
     def __repr__(self):
-        return str(self.loc)
+        return str((self.x, self.y))
 
     def __iter__(self):
-        return iter(self.loc)
+        return iter((self.x, self.y))
 
     def __eq__(self, other):
-        return self.loc == getattr(other, "loc", None)
+        if self is other: return True
+        return (self.x, self.y) == getattr(other, "loc", None)
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
     def __hash__(self):
-        return hash(self.loc)
+        return hash((self.x, self.y))
+
+    def __reduce__(self):
+        return Loc, (self.x, self.y)
 
-    def moved(self, x, y):
+    def moved(self, x, y, board=None):
         """ Return a new Loc moved according to delta modifiers `x` and `y`,
-            e.g. 1,0 to move right.
+            e.g. 1,0 to move right; with `board`, return its interned location.
         """
+        if board: return board.loc(self.x + x, self.y + y)
         return Loc(self.x + x, self.y + y)
 
+
+setslot = object.__setattr__
+
+
+class InternedLoc(Loc):
+    """ Location of a `Geometry` pool, shared by all users of the board; it's immutable (creating one is
+        slower, but they are only created with the pool).
+    """
+    __slots__ = ()
+
+    def __init__(self, x, y):
+        setslot(self, "x", x)
+        setslot(self, "y", y)
+
+    def __setattr__(self, attr, val):
+        raise AttributeError("interned Loc is immutable, use moved() to get a new location")
+
 Dir = Loc   # Directions (e.g. 0,1=right) work the same way but should have a different name for clarity
 
+
+def isstr(val):
+    try              : return isinstance(val, basestring)
+    except NameError : return isinstance(val, str)
+
+
+class TileRegistry(object):
+    """ Registry of tile types for compact boards: maps small integer codes to `BaseTile` subclasses
+        (or to tile strings for boards with string tiles); code 0 is always the default tile.
+    """
+    def __init__(self, def_tile):
+        self.types = [def_tile]
+        self.codes = {def_tile: 0}
+
+    def tiletype(self, tile):
+        return tile if isstr(tile) else type(tile)
+
+    def code(self, tile):
+        """Return code of the type of `tile`, registering the type if it's new."""
+        tiletype = self.tiletype(tile)
+        code     = self.codes.get(tiletype)
+        if code is None:
+            code = self.codes[tiletype] = len(self.types)
+            self.types.append(tiletype)
+        return code
+
+
+class CompactStorage(object):
+    """ Flat storage of tile codes in an `array`, one unsigned short per cell.
+
+        Tile instances are materialised lazily on first access and kept in a sparse dict keyed by flat
+        index, so that changes made to a tile persist; `compact()` drops instances that can be
+        recreated from their type and location.
+    """
+    def __init__(self, width, height, def_tile):
+        self.width    = width
+        self.height   = height
+        self.registry   = TileRegistry(def_tile)
+        self.locs       = geometry(width, height).locs
+        self.tile_index = None
+        self.clear()
+
+    def __iter__(self):
+        """Generate rows of tiles, like list of lists storage does."""
+        for y in range(self.height):
+            yield [self.get(loc) for loc in self.locs[y*self.width : (y+1)*self.width]]
+
+    def clear(self):
+        self.codes   = array('H', [0]) * (self.width * self.height)
+        self.objects = {}
+
+    def index(self, loc):
+        return loc.y*self.width + loc.x
+
+    def get(self, loc):
+        i = loc.y*self.width + loc.x
+        tile = self.objects.get(i)
+        if tile is None:
+            tiletype = self.registry.types[self.codes[i]]
+            if isstr(tiletype):
+                return tiletype
+            tile = tiletype(loc)
+            self.objects[i] = tile
+            if self.tile_index:
+                tile.tile_index = self.tile_index
+        return tile
+
+    def set(self, loc, item):
+        i = loc.y*self.width + loc.x
+        self.codes[i] = self.registry.code(item)
+        if isstr(item) : self.objects.pop(i, None)
+        else           : self.objects[i] = item
+
+    def code(self, loc):
+        return self.codes[loc.y*self.width + loc.x]
+
+    def reset(self, loc):
+        """Put the default tile back at `loc`."""
+        i = loc.y*self.width + loc.x
+        self.codes[i] = 0
+        self.objects.pop(i, None)
+
+    def plain(self, tile, loc):
+        """Tile can be dropped if it has no instance state beyond what `BaseTile.__init__` sets."""
+        attrs = vars(tile)
+        name  = tile.__class__.__name__.lower()
+        return set(attrs) <= set(["loc", name]) and attrs.get("loc") == loc
+
+    def compact(self):
+        """Drop materialised tiles that can be recreated; return number of tiles dropped."""
+        locs = self.locs
+        drop = [i for i, t in self.objects.items() if self.plain(t, locs[i])]
+        for i in drop:
+            del self.objects[i]
+        return len(drop)
+
+
+class LayeredStorage(object):
+    """ Storage for compact stackable boards: the base (bottom) tile of each cell is kept in
+        `CompactStorage`, and items stacked on top of it in a sparse dict of lists keyed by flat index,
+        so that cells holding just the default tile don't need a list each.
+    """
+    def __init__(self, width, height, def_tile):
+        self.width   = width
+        self.base    = CompactStorage(width, height, def_tile)
+        self.overlay = {}
+
+    def __iter__(self):
+        """Generate rows of stacks, like list of lists of lists storage does."""
+        width, overlay = self.width, self.overlay
+        for y, row in enumerate(self.base):
+            yield [[tile] + overlay.get(y*width + x, []) for x, tile in enumerate(row)]
+
+    def clear(self):
+        self.base.clear()
+        self.overlay = {}
+
+    def top(self, loc):
+        items = self.overlay.get(loc.y*self.width + loc.x)
+        return items[-1] if items else self.base.get(loc)
+
+    def stack(self, loc):
+        """Return new list of items at `loc`, from the base tile up."""
+        return [self.base.get(loc)] + self.overlay.get(loc.y*self.width + loc.x, [])
+
+    def empty(self, loc):
+        return loc.y*self.width + loc.x not in self.overlay
+
+    def push(self, loc, item):
+        self.overlay.setdefault(loc.y*self.width + loc.x, []).append(item)
+
+    def pop(self, loc):
+        """Remove top item at `loc`; removing the base tile puts the default tile in its place."""
+        i     = loc.y*self.width + loc.x
+        items = self.overlay.get(i)
+        if not items:
+            self.base.reset(loc)
+            return
+        items.pop()
+        if not items:
+            del self.overlay[i]
+
+    def remove(self, loc, item):
+        """Remove `item` from stack at `loc`, like `list.remove()`; the top item is removed in O(1)."""
+        items = self.overlay.get(loc.y*self.width + loc.x)
+        if items and items[-1] is item:
+            self.pop(loc)
+        else:
+            stack = self.stack(loc)
+            stack.remove(item)
+            self.replace(loc, stack)
+
+    def replace(self, loc, stack):
+        i = loc.y*self.width + loc.x
+        if stack : self.base.set(loc, stack[0])
+        else     : self.base.reset(loc)
+
+        if len(stack) > 1 : self.overlay[i] = stack[1:]
+        else              : self.overlay.pop(i, None)
+
+
+class Geometry(object):
+    """ Precomputed neighbour and 'next location' tables for one board geometry, using flat indexes
+        (i = y*width + x); shared by all boards of the same (width, height, wrap), see `geometry()`.
+
+        `nextind[dir][i]` is the index next to `i` in `dir` direction, or None at the board edge; rays
+        are built from these on first use and cached.
+    """
+    dirs = [(0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1)]
+
+    def __init__(self, width, height, wrap=False):
+        self.width  = width
+        self.height = height
+        self.wrap   = wrap
+        self.size   = width * height
+        self.locs   = [InternedLoc(i % width, i // width) for i in range(self.size)]
+        self.rays   = {}
+
+        self.nextind    = dict( (d, [self.make_next(i, d) for i in range(self.size)]) for d in self.dirs )
+        cross           = [self.nextind[d] for d in self.dirs[0::2]]
+        allnb           = [self.nextind[d] for d in self.dirs]
+        self.neighbours = [ [t[i] for t in allnb if t[i] is not None] for i in range(self.size) ]
+        self.cross      = [ [t[i] for t in cross if t[i] is not None] for i in range(self.size) ]
+
+    def make_next(self, i, dir):
+        x = i % self.width + dir[0]
+        y = i // self.width + dir[1]
+
+        if self.wrap:
+            x, y = x % self.width, y % self.height
+        elif not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        return y*self.width + x
+
+    def loc(self, x, y):
+        """Return interned location for `x`, `y`; locations outside the board are not interned."""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.locs[y*self.width + x]
+        return Loc(x, y)
+
+    def ray(self, i, dir):
+        """Return tuple of indexes from `i` (excluding) in `dir` direction to the edge of board."""
+        key = i, dir
+        ray = self.rays.get(key)
+        if ray is None:
+            nextind, ray = self.nextind[dir], []
+            j = nextind[i]
+            while j is not None and j != i and len(ray) < self.size:
+                ray.append(j)
+                j = nextind[j]
+            ray = self.rays[key] = tuple(ray)
+        return ray
+
+
+geometries = {}
+
+def geometry(width, height, wrap=False):
+    """Return shared `Geometry` tables for board of `width`, `height` size, building them on first use."""
+    key = width, height, wrap
+    if key not in geometries:
+        geometries[key] = Geometry(width, height, wrap)
+    return geometries[key]
+
+
+class LocSet(object):
+    """Set of locations that also supports O(1) random choice."""
+    def __init__(self):
+        self.locs = []
+        self.pos  = {}
+
+    def __len__(self)           : return len(self.locs)
+    def __iter__(self)          : return iter(self.locs)
+    def __contains__(self, loc) : return loc in self.pos
+
+    def add(self, loc):
+        if loc not in self.pos:
+            self.pos[loc] = len(self.locs)
+            self.locs.append(loc)
+
+    def discard(self, loc):
+        i = self.pos.pop(loc, None)
+        if i is not None:
+            last = self.locs.pop()
+            if i < len(self.locs):
+                self.locs[i]   = last
+                self.pos[last] = i
+
+    def choice(self):
+        return rndchoice(self.locs)
+
+
+class TileIndex(object):
+    """ Index of locations by tile attribute for `attrs` attributes: `true[attr]` and `false[attr]` hold
+        locations of tiles where the attribute is set / not set.
+
+        The index is updated when tiles are placed on or deleted from the board; attribute changes on
+        `AttrToggles` tiles are picked up automatically, other tiles need to be passed to `update()`.
+    """
+    def __init__(self, board, attrs):
+        self.board = board
+        self.attrs = attrs
+        self.clear()
+
+    def clear(self):
+        self.true  = dict( (attr, LocSet()) for attr in self.attrs )
+        self.false = dict( (attr, LocSet()) for attr in self.attrs )
+
+    def covers(self, attrs):
+        return all(attr in self.true for attr in attrs)
+
+    def add(self, loc, tile, attrs=None):
+        for attr in attrs or self.attrs:
+            if getattr(tile, attr) : self.true[attr].add(loc); self.false[attr].discard(loc)
+            else                   : self.false[attr].add(loc); self.true[attr].discard(loc)
+
+        if not isstr(tile) and getattr(tile, "tile_index", None) is not self:
+            tile.tile_index = self
+
+    def update(self, tile, changed=None):
+        """Re-index `tile` after its attributes (`changed` list, or all attributes) have changed."""
+        attrs = None
+        if changed and "loc" not in changed:
+            attrs = [attr for attr in changed if attr in self.true]
+            if not attrs: return
+
+        loc = getattr(tile, "loc", None)
+        if isinstance(loc, Loc) and self.board.valid(loc) and self.board[loc] is tile:
+            self.add(self.board.loc(loc.x, loc.y), tile, attrs)
+
+    def locations(self, attrs, negate=False):
+        """Return locations where all of `attrs` are set, or all are not set if `negate` is true."""
+        sets = [(self.false if negate else self.true)[attr] for attr in attrs]
+        sets.sort(key=len)
+        locs = sets[0]
+        return [loc for loc in locs if all(loc in s for s in sets[1:])]
+
+    def choice(self, attrs, negate=False):
+        sets = [(self.false if negate else self.true)[attr] for attr in attrs]
+        if len(sets) == 1:
+            return sets[0].choice()
+        return rndchoice(self.locations(attrs, negate))
+
+
 class BaseBoard(object):
     """ Base Board for regular and stackable boards.
 
+        With `diff_render`, the board is drawn by `DiffRenderer`, which only updates the changed
+        tiles on the screen; the default is set by module-level `diff_render` setting.
+
+        In `headless` mode the board is never drawn and `game_over()` raises `GameOver` instead of
+        exiting, which allows running many games in a batch (see `headless.py`).
+
         TODO: add various scrolling and visual area options.
     """
     stackable         = False
     board_initialized = False
+    tile_index        = None
+    recorder          = None
 
-    def __init__(self, size, num_grid=False, padding=(0, 0), pause_time=0.2, screen_sep=5):
+    def __init__(self, size, num_grid=False, padding=(0, 0), pause_time=0.2, screen_sep=5, headless=False,
+                 diff_render=None):
         if isinstance(size, int):
             size = size, size   # handle square board
 
@@ -64,35 +424,88 @@ class BaseBoard(object):
         self.ypad        = padding[1]
         self.pause_time  = pause_time
         self.screen_sep  = screen_sep
+        self.headless    = headless
         self.init_tiles  = False
 
         self.tiletpl     = "%%%ds" % (padding[0] + 1)
+        self._geometry   = None
+        self.renderer    = None
+
+        if diff_render is None: diff_render = globals()["diff_render"]
+        if diff_render and sys.stdout.isatty():
+            self.renderer = DiffRenderer(self)
+        if record_file:
+            from replay import Recorder
+            Recorder.attach(self, record_file, record_seed)
         self.directions()
 
+    @property
+    def geometry(self):
+        """Neighbour / ray tables for this board's size, built lazily (see `Geometry`)."""
+        if not self._geometry:
+            self._geometry = geometry(self.width, self.height)
+        return self._geometry
+
     def __iter__(self):
-        return ( self[Loc(x, y)] for y in range(self.height) for x in range(self.width) )
+        return ( self[loc] for loc in self.geometry.locs )
 
     def tiles(self, *attrs):
+        if self.indexed(attrs):
+            return [ self[l] for l in self.locations(*attrs) ]
         return [ t for t in self if all(getattr(t, attr) for attr in attrs) ]
 
     def tiles_not(self, *attrs):
+        if self.indexed(attrs):
+            return [ self[l] for l in self.locations_not(*attrs) ]
         return [ t for t in self if all(not getattr(t, attr) for attr in attrs) ]
 
     def locations(self, *attrs):
-        locs = (Loc(x, y) for y in range(self.height) for x in range(self.width))
+        if self.indexed(attrs):
+            return sorted(self.tile_index.locations(attrs), key=self.locindex)
+        locs = self.geometry.locs
         return [ l for l in locs if all(getattr(self[l], attr) for attr in attrs) ]
 
     def locations_not(self, *attrs):
-        locs = (Loc(x, y) for y in range(self.height) for x in range(self.width))
+        if self.indexed(attrs):
+            return sorted(self.tile_index.locations(attrs, negate=True), key=self.locindex)
+        locs = self.geometry.locs
         return [ l for l in locs if all(not getattr(self[l], attr) for attr in attrs) ]
 
+    def indexed(self, attrs):
+        """Can tile / location queries for `attrs` be answered from the tile index?"""
+        if self.tile_index and attrs:
+            self.init_board()
+            return self.tile_index.covers(attrs)
+
+    def locindex(self, loc):
+        return loc.y*self.width + loc.x
+
+    def random_loc(self, *attrs):
+        """Random location of a tile with all `attrs` set; uses tile index when available."""
+        if self.indexed(attrs):
+            return self.tile_index.choice(attrs)
+        return rndchoice(self.locations(*attrs))
+
+    def random_loc_not(self, *attrs):
+        """Random location of a tile with none of `attrs` set; uses tile index when available."""
+        if self.indexed(attrs):
+            return self.tile_index.choice(attrs, negate=True)
+        return rndchoice(self.locations_not(*attrs))
+
     def ploc(self, tile_loc):
         """Parse location out of tile-or-loc `tile_loc`."""
         if isinstance(tile_loc, Loc) : return tile_loc
         else                         : return tile_loc.loc
 
     def draw(self, pause=None):
+        if self.recorder: self.recorder.sync()
+        if self.headless: return
         pause = pause or self.pause_time
+        if self.renderer:
+            self.renderer.draw()
+            sleep(pause)
+            return
+
         print(nl * self.screen_sep)
 
         if self.num_grid:
@@ -111,6 +524,13 @@ class BaseBoard(object):
     def status(self):
         pass
 
+    def game_over(self, msg=None, **result):
+        """End the game: print `msg` and exit, or raise `GameOver` with `result` in headless mode."""
+        if self.headless:
+            raise GameOver(Container(**result))
+        if msg: print(nl, msg)
+        sys.exit()
+
     def valid(self, loc):
         return bool( loc.x >= 0 and loc.y >= 0 and loc.x <= self.width-1 and loc.y <= self.height-1 )
 
@@ -123,10 +543,10 @@ class BaseBoard(object):
 
     def neighbour_locs(self, tile_loc):
         """Return the list of neighbour locations of `tile`."""
-        x, y = self.ploc(tile_loc)
-        coords = (-1,0,1)
-        locs = set((x+n, y+m) for n in coords for m in coords) - set( [(x,y)] )
-        return [ Loc(*tpl) for tpl in locs if self.valid(Loc(*tpl)) ]
+        loc  = self.ploc(tile_loc)
+        G    = self.geometry
+        locs = G.locs
+        return [ locs[i] for i in G.neighbours[loc.y*self.width + loc.x] ]
 
     def neighbours(self, tile_loc):
         """Return the list of neighbours of `tile`."""
@@ -134,9 +554,10 @@ class BaseBoard(object):
 
     def neighbour_cross_locs(self, tile_loc):
         """Return a generator of neighbour 'cross' (i.e. no diagonal) locations of `tile`."""
-        x, y = self.ploc(tile_loc)
-        locs = ((x-1, y), (x+1, y), (x, y-1), (x, y+1))
-        return [ Loc(*tpl) for tpl in locs if self.valid(Loc(*tpl)) ]
+        loc  = self.ploc(tile_loc)
+        G    = self.geometry
+        locs = G.locs
+        return [ locs[i] for i in G.cross[loc.y*self.width + loc.x] ]
 
     def cross_neighbours(self, tile_loc):
         """Return the generator of 'cross' (i.e. no diagonal) neighbours of `tile`."""
@@ -159,6 +580,12 @@ class BaseBoard(object):
         """Return location next to `tile_loc` point in direction `dir`."""
         loc = self.ploc(tile_loc)
 
+        if n == 1 and self.valid(loc):
+            G = geometry(self.width, self.height, True) if wrap else self.geometry
+            if (dir.x, dir.y) in G.nextind:
+                i = G.nextind[dir.x, dir.y][loc.y*self.width + loc.x]
+                return None if i is None else G.locs[i]
+
         x   = loc.x + dir.x*n
         y   = loc.y + dir.y*n
 
@@ -170,9 +597,13 @@ class BaseBoard(object):
                 if y > (self.height - 1) : y -= self.height
                 elif y < 0               : y += self.height
 
-        loc = Loc(x, y)
+        loc = self.geometry.loc(x, y)
         return loc if self.valid(loc) else None
 
+    def loc(self, x, y):
+        """Return interned location `x`, `y` of this board's geometry."""
+        return self.geometry.loc(x, y)
+
     def next_tile(self, tile_loc, dir, n=1):
         loc = self.nextloc(tile_loc, dir, n)
         return self[loc] if loc else None
@@ -185,12 +616,15 @@ class BaseBoard(object):
         """ Generate a 'ray' of tiles from `tile` start in `dir` direction for `n` tiles; if n is
             0, to the end of board, excluding `start`.
         """
-        while True:
-            tile = self.next_tile(tile, dir)
-            if tile   : yield tile
-            else      : break
-            if n == 1 : break
-            if n: n -= 1
+        loc  = self.ploc(tile)
+        G    = self.geometry
+        locs = G.locs
+        ray  = G.ray(loc.y*self.width + loc.x, (dir.x, dir.y))
+
+        for i in (ray[:n] if n else ray):
+            tile = self[locs[i]]
+            if tile : yield tile
+            else    : break
 
     def reset(self):
         self.board_initialized = False
@@ -198,32 +632,51 @@ class BaseBoard(object):
 
 
 class Board(BaseBoard):
-    def __init__(self, size, def_tile, **kwargs):
+    """ Regular board, one tile per location.
+
+        With `compact=True`, tiles are stored as type codes in a flat array (see `CompactStorage`)
+        instead of a list of lists of tile instances; this is meant for large headless boards.
+
+        With `index` set to a list of tile attribute names, locations are indexed by these attributes
+        (see `TileIndex`) so that `tiles()`, `locations()` etc. and random picks do not need to scan
+        the board.
+    """
+    def __init__(self, size, def_tile, compact=False, index=None, **kwargs):
         super(Board, self).__init__(size, **kwargs)
 
-        try              : self._def_tile_str = isinstance(def_tile, basestring)
-        except NameError : self._def_tile_str = isinstance(def_tile, str)
+        self._def_tile_str = isstr(def_tile)
+        self.def_tile      = def_tile
+        self.compact       = compact
+        xrng, yrng         = range(self.width), range(self.height)
 
-        self.def_tile = def_tile
-        xrng, yrng    = range(self.width), range(self.height)
-        self.board    = [ [None for x in xrng] for y in yrng ]
+        if compact : self.board = CompactStorage(self.width, self.height, def_tile)
+        else       : self.board = [ [None for x in xrng] for y in yrng ]
+
+        if index:
+            self.tile_index = TileIndex(self, index)
+            if compact: self.board.tile_index = self.tile_index
 
     def __getitem__(self, loc):
         self.init_board()
+        if self.compact: return self.board.get(loc)
         return self.board[loc.y][loc.x]
 
     def __setitem__(self, tile_loc, item):
         self.init_board()
         loc = self.ploc(tile_loc)
-        self.board[loc.y][loc.x] = item
+        if self.compact: self.board.set(loc, item)
+        else: self.board[loc.y][loc.x] = item
+        if self.tile_index: self.tile_index.add(self.loc(loc.x, loc.y), item)
+        if self.recorder: self.recorder.set(loc, item)
 
     def __delitem__(self, tile_loc):
-        loc = self.ploc(tile_loc)
-        self.board[loc.y][loc.x] = self.make_tile(loc)
+        self[tile_loc] = self.make_tile(self.ploc(tile_loc))
 
     def empty(self, tile_loc):
         loc = self.ploc(tile_loc)
-        if self._def_tile_str:
+        if self.compact:
+            return self.board.code(loc) == 0
+        elif self._def_tile_str:
             return bool(self[loc] == self.def_tile)
         else:
             return isinstance(self[loc], self.def_tile)
@@ -235,47 +688,85 @@ class Board(BaseBoard):
         """
         if not self.board_initialized:
             self.board_initialized = True
-            xrng, yrng = range(self.width), range(self.height)
-            self.board = [ [self.make_tile(Loc(x, y)) for x in xrng] for y in yrng ]
+            if self.compact:
+                self.board.clear()      # default tiles are materialised lazily by CompactStorage
+            else:
+                loc, xrng, yrng = self.loc, range(self.width), range(self.height)
+                self.board = [ [self.make_tile(loc(x, y)) for x in xrng] for y in yrng ]
+            self.reindex()
+
+    def reindex(self):
+        """Rebuild tile index from scratch."""
+        index = self.tile_index
+        if index:
+            index.clear()
+            for loc in self.geometry.locs:
+                index.add(loc, self[loc])
+
+    def compact_tiles(self):
+        """Release tile instances of a compact board that can be recreated on access."""
+        return self.board.compact() if self.compact else 0
 
 
 class StackableBoard(BaseBoard):
+    """ Board with a stack of items in each cell; the top item is returned by `board[loc]`.
+
+        With `compact=True`, base tiles are stored in a flat array and items stacked on them in a
+        sparse dict (see `LayeredStorage`); `items()` then returns a new list, so stacks should be
+        changed through the board rather than by changing that list.
+    """
     stackable = True
+    compact   = False
 
-    def __init__(self, size, def_tile, **kwargs):
+    def __init__(self, size, def_tile, compact=False, **kwargs):
         super(StackableBoard, self).__init__(size, **kwargs)
 
-        try              : self._def_tile_str = isinstance(def_tile, basestring)
-        except NameError : self._def_tile_str = isinstance(def_tile, str)
+        self._def_tile_str = isstr(def_tile)
+        self.def_tile      = def_tile
+        self.compact       = compact
+        xrng, yrng         = range(self.width), range(self.height)
 
-        self.def_tile = def_tile
-        xrng, yrng    = range(self.width), range(self.height)
-        self.board    = [ [[None] for x in xrng] for y in yrng ]
+        if compact : self.board = LayeredStorage(self.width, self.height, def_tile)
+        else       : self.board = [ [[None] for x in xrng] for y in yrng ]
 
     def __getitem__(self, loc):
         self.init_board()
+        if self.compact: return self.board.top(loc)
         return self.board[loc.y][loc.x][-1]
 
     def __setitem__(self, tile_loc, item):
         self.init_board()
         loc = self.ploc(tile_loc)
-        self.board[loc.y][loc.x].append(item)
+        if self.compact: self.board.push(loc, item)
+        else: self.board[loc.y][loc.x].append(item)
+        if self.recorder: self.recorder.set(loc, item)
 
     def __delitem__(self, tile_loc):
         loc = self.ploc(tile_loc)
-        del self.board[loc.y][loc.x][-1]
+        if self.compact: self.board.pop(loc)
+        else: del self.board[loc.y][loc.x][-1]
+        if self.recorder: self.recorder.set(loc, self[loc])
 
     def empty(self, tile_loc):
+        if self.compact:
+            self.init_board()
+            return self.board.empty(self.ploc(tile_loc))
         return len( self.items(self.ploc(tile_loc)) ) == 1
 
     def init_board(self):
         if not self.board_initialized:
             self.board_initialized = True
-            xrng, yrng = range(self.width), range(self.height)
-            self.board = [ [ [self.make_tile( Loc(x, y) )] for x in xrng] for y in yrng ]
+            if self.compact:
+                self.board.clear()      # base tiles are materialised lazily by CompactStorage
+            else:
+                loc, xrng, yrng = self.loc, range(self.width), range(self.height)
+                self.board = [ [ [self.make_tile( loc(x, y) )] for x in xrng] for y in yrng ]
 
     def items(self, tile_loc):
         loc = self.ploc(tile_loc)
+        if self.compact:
+            self.init_board()
+            return self.board.stack(loc)
         return self.board[loc.y][loc.x]
 
     def get_instance(self, cls, tile_loc, default=None):
@@ -287,7 +778,18 @@ class StackableBoard(BaseBoard):
 
         loc = self.ploc(tile_loc)
         self[newloc] = item
-        self.items(loc).remove(item)
+
+        if self.compact:
+            self.board.remove(loc, item)
+        else:
+            stack = self.items(loc)
+            if stack[-1] is item : stack.pop()
+            else                 : stack.remove(item)
+        if self.recorder: self.recorder.set(loc, self[loc])
 
         if hasattr(item, "loc"):
             item.loc = newloc
+
+    def compact_tiles(self):
+        """Release base tile instances of a compact board that can be recreated on access."""
+        return self.board.base.compact() if self.compact else 0
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+
+""" Play a batch of headless AI games across a process pool and report win rates and speed.
+
+    usage: headless.py game [num_games] [setting=value ...]
+
+    `game` is one of the game modules listed in `games`; settings override module-level settings of
+    the game, e.g. `headless.py versi 100 ai_search=False size=8,8`.
+"""
+
+import sys
+import random
+from time import time
+from collections import Counter
+from importlib import import_module
+from multiprocessing import Pool
+
+games     = ("versi", "betelgeuse", "robots", "bblocks", "mines")
+num_games = 100
+
+
+def parse_setting(arg):
+    name, val = arg.split('=', 1)
+    try               : val = eval(val, {})
+    except NameError  : pass
+    return name, val
+
+def play(args):
+    """Play one game of `game` module with `seed` and `settings`; return the result."""
+    game, seed, settings = args
+    random.seed(seed)
+    module = import_module(game)
+    for name, val in settings:
+        setattr(module, name, val)
+    return module.run_headless()
+
+def run(game, num_games, settings=(), processes=None):
+    """Play `num_games` games of `game` in a process pool; return list of results and elapsed time."""
+    start = time()
+    jobs  = [(game, n, settings) for n in range(num_games)]
+    pool  = Pool(processes)
+    try:
+        results = pool.map(play, jobs, chunksize=max(1, num_games // 64))
+    finally:
+        pool.close()
+    return results, time() - start
+
+def report(game, results, elapsed):
+    winners = Counter(r.winner for r in results)
+    print("%s: %d games in %.2fs, %.1f games/s" % (game, len(results), elapsed, len(results) / elapsed))
+    for winner, count in winners.most_common():
+        print("  %-8s %5.1f%%" % (winner or "draw", 100.0 * count / len(results)))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in games:
+        print(__doc__)
+        sys.exit()
+
+    game     = sys.argv[1]
+    args     = sys.argv[2:]
+    num      = int(args.pop(0)) if args and args[0].isdigit() else num_games
+    settings = [parse_setting(a) for a in args]
+    report(game, *run(game, num, settings))
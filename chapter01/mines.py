@@ -5,11 +5,14 @@ import sys
 from random import randint
 from time import sleep
 
-from utils import TextInput, nl, first
+from utils import TextInput, nl, first, iround
+from board import GameOver
 from mines_lib import MinesBoard, Mines, Tile
+from mines_solver import Solver
 
 size       = 6, 6
 num_mines  = randint(4, 8)
+density    = None   # if set, number of mines is density * number of tiles (used by headless runs)
 mark_key   = 'm'
 padding    = 2, 1
 
@@ -34,8 +37,20 @@ class BasicInterface(object):
             mines.check_end(tile)
 
 
-if __name__ == "__main__":
-    board = MinesBoard(size, Tile, num_mines=num_mines, num_grid=True, padding=padding)
+def new_game(**kwargs):
+    global board, mines
+    n     = iround(density * size[0] * size[1]) if density else num_mines
+    board = MinesBoard(size, Tile, num_mines=n, num_grid=True, padding=padding, **kwargs)
     mines = Mines(board)
+
+def run_headless():
+    """Play one game with the solver without drawing; return the result (see `board.GameOver`)."""
+    new_game(headless=True)
+    try                  : Solver(board, mines).play()
+    except GameOver as e : return e.result
+
+
+if __name__ == "__main__":
+    new_game()
     try                      : BasicInterface().run()
     except KeyboardInterrupt : pass
@@ -1,9 +1,14 @@
 # -*- encoding: utf-8 -*-
 
-import sys
-from random import choice as rndchoice
+from random import sample
+from collections import deque
 from time import time
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from utils import AttrToggles, timefmt
 from board import Board, BaseTile
 
@@ -37,39 +42,81 @@ class Tile(BaseTile, AttrToggles):
 
 class MinesBoard(Board):
     def __init__(self, *args, **kwargs):
-        num_mines = kwargs.pop("num_mines")
+        num_mines = self.num_mines = kwargs.pop("num_mines")
+        kwargs.setdefault("index", ("mine", "hidden"))
 
         super(MinesBoard, self).__init__(*args, **kwargs)
         self.divider = '-' * (self.width * 4 + 4)
 
-        for _ in range(num_mines):
-            self.random_empty().mine = True
+        locs  = self.geometry.locs
+        mines = [0] * len(locs)
+        for i in sample(range(len(locs)), num_mines):
+            self[locs[i]].mine = True
+            mines[i] = 1
+
+        for loc, number in zip(locs, self.mine_counts(mines)):
+            self[loc].number = number
 
-        for tile in self:
-            tile.number = sum( nbtile.mine for nbtile in self.neighbours(tile) )
+    def mine_counts(self, mines):
+        """ Return flat list of numbers of neighbour mines for each location, given flat list of
+            `mines` (1 for a mine); uses NumPy 2D convolution when available.
+        """
+        w, h = self.width, self.height
+        if numpy:
+            grid   = numpy.zeros((h+2, w+2), dtype=numpy.int8)
+            grid[1:-1, 1:-1] = numpy.array(mines, dtype=numpy.int8).reshape(h, w)
+            counts = sum(grid[1+dy : h+1+dy, 1+dx : w+1+dx] for dy in (-1, 0, 1) for dx in (-1, 0, 1))
+            return (counts - grid[1:-1, 1:-1]).ravel().tolist()
+
+        # sliding window: sum each row over 3 columns, then sum 3 rows of these sums
+        rows = [mines[y*w : (y+1)*w] for y in range(h)]
+        hsum = []
+        for row in rows:
+            padded = [0] + row + [0]
+            hsum.append([padded[x] + padded[x+1] + padded[x+2] for x in range(w)])
+
+        blank  = [0] * w
+        hsum   = [blank] + hsum + [blank]
+        counts = []
+        for y in range(h):
+            above, mid, below = hsum[y], hsum[y+1], hsum[y+2]
+            counts.extend(above[x] + mid[x] + below[x] - rows[y][x] for x in range(w))
+        return counts
 
     def cleared(self):
-        return all( self.marked_or_revealed(tile) for tile in self )
+        """Note: only hidden tiles can be neither marked nor revealed, so only these need checking."""
+        return all( self.marked_or_revealed(self[loc]) for loc in self.locations("hidden") )
 
     def marked_or_revealed(self, tile) : return bool(tile.revealed or tile.mine and tile.marked)
-    def random_hidden(self)            : return rndchoice(self.locations("hidden"))
-    def random_empty(self)             : return rndchoice(self.tiles_not("mine"))
+    def random_hidden(self)            : return self.random_loc("hidden")
+    def random_empty(self)             : return self[self.random_loc_not("mine")]
 
     def reveal(self, tile):
         """ Reveal all empty (number=0) tiles adjacent to starting tile `loc` and subsequent unhidden tiles.
-            Uses floodfill algorithm.
+            Uses breadth-first floodfill over flat location indexes; returns list of indexes of newly
+            revealed tiles.
         """
-        if tile.number   : tile.revealed = True
-        if tile.revealed : return
+        G        = self.geometry
+        locs     = G.locs
+        queue    = deque([self.locindex(tile.loc)])
+        revealed = []
+
+        while queue:
+            i    = queue.popleft()
+            tile = self[locs[i]]
+            if tile.revealed : continue
 
-        tile.revealed = True
-        for nbtile in self.neighbours(tile): self.reveal(nbtile)
+            tile.revealed = True
+            revealed.append(i)
+            if not tile.number:
+                queue.extend(G.neighbours[i])
+        return revealed
 
 
 class Mines(object):
     start    = time()
-    win_msg  = "\n All mines cleared! (%s)"
-    lose_msg = "\n KABOOM. END."
+    win_msg  = "All mines cleared! (%s)"
+    lose_msg = "KABOOM. END."
 
     def __init__(self, board):
         self.board = board
@@ -83,12 +130,11 @@ class Mines(object):
 
     def game_lost(self):
         B = self.board
-        for tile in B: B.reveal(tile)
+        if not B.headless:
+            for tile in B: B.reveal(tile)
         B.draw()
-        print(self.lose_msg)
-        sys.exit()
+        B.game_over(self.lose_msg, winner="mines")
 
     def game_won(self):
         self.board.draw()
-        print( self.win_msg % timefmt(time() - self.start) )
-        sys.exit()
+        self.board.game_over(self.win_msg % timefmt(time() - self.start), winner="player")
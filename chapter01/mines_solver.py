@@ -0,0 +1,127 @@
+# -*- encoding: utf-8 -*-
+
+""" Minesweeper solver that plays `MinesBoard` using constraint reasoning.
+
+    Each revealed number gives a constraint: its hidden neighbours contain (number - marked
+    neighbours) mines. The solver applies, in order:
+
+        single-point rules - no mines left in a constraint: all its cells are safe; as many mines as
+                             cells: all its cells are mines
+        subset rules       - if cells of constraint A are a subset of cells of B, the remaining cells
+                             of B contain (mines of B - mines of A) mines
+        guessing           - reveal the hidden cell with the lowest estimated mine probability
+
+    Use through `mines.run_headless()`, e.g. `headless.py mines 1000 size=16,16 density=0.15`.
+"""
+
+from random import choice as rndchoice
+
+
+class Solver(object):
+    def __init__(self, board, mines):
+        self.board    = board
+        self.mines    = mines
+        self.G        = board.geometry
+        self.locs     = self.G.locs
+        self.frontier = set()      # revealed numbered cells that may still have hidden neighbours
+        self.marked   = 0
+
+    def tile(self, i):
+        return self.board[self.locs[i]]
+
+    def reveal(self, i):
+        tile = self.tile(i)
+        for j in self.board.reveal(tile):
+            if self.tile(j).number: self.frontier.add(j)
+        self.mines.check_end(tile)
+
+    def mark(self, i):
+        tile = self.tile(i)
+        tile.toggle_mark()
+        self.marked += 1
+        self.mines.check_end(tile)
+
+    def constraints(self):
+        """ Return list of (frozenset of hidden unmarked cells, number of mines among them); cells of the
+            frontier without hidden neighbours are dropped from it, as the solver never unmarks a cell.
+        """
+        tile, neighbours = self.tile, self.G.neighbours
+        result, done     = set(), []
+
+        for i in self.frontier:
+            cells  = []
+            marked = 0
+            for j in neighbours[i]:
+                nb = tile(j)
+                if nb.marked   : marked += 1
+                elif nb.hidden : cells.append(j)
+            if cells : result.add( (frozenset(cells), tile(i).number - marked) )
+            else     : done.append(i)
+
+        self.frontier.difference_update(done)
+        return list(result)
+
+    def deduce(self, constraints):
+        """Return (safe cells, mine cells) deduced from `constraints`."""
+        safe, mines = set(), set()
+
+        for cells, count in constraints:
+            if count == 0            : safe.update(cells)
+            elif count == len(cells) : mines.update(cells)
+        if safe or mines:
+            return safe, mines
+
+        by_cell = {}
+        for con in constraints:
+            for i in con[0]:
+                by_cell.setdefault(i, []).append(con)
+
+        for cells, count in constraints:
+            others = set(con for i in cells for con in by_cell[i])
+            for cells2, count2 in others:
+                if cells < cells2:
+                    rest, left = cells2 - cells, count2 - count
+                    if left == 0            : safe.update(rest)
+                    elif left == len(rest)  : mines.update(rest)
+        return safe, mines
+
+    def guess(self, constraints):
+        """Return hidden cell with the lowest estimated probability of being a mine."""
+        hidden = [self.board.locindex(loc) for loc in self.board.locations("hidden")]
+        prob   = {}
+
+        for cells, count in constraints:
+            p = count / float(len(cells))
+            for i in cells:
+                prob[i] = max(prob.get(i, 0), p)
+
+        outside = [i for i in hidden if i not in prob]
+        if outside:
+            left    = self.board.num_mines - self.marked - sum(prob.values())
+            density = max(0, left) / float(len(outside))
+            for i in outside:
+                prob[i] = density
+
+        lowest = min(prob.values())
+        return rndchoice([i for i in hidden if prob[i] == lowest])
+
+    def play(self):
+        """Play until the game ends, which raises `GameOver` on a headless board."""
+        board = self.board
+        self.reveal(board.locindex(board.random_hidden()))
+
+        while True:
+            constraints = self.constraints()
+            safe, mines = self.deduce(constraints)
+
+            hidden = board.locations("hidden")
+            if not safe and not mines and len(hidden) == board.num_mines - self.marked:
+                mines = set(board.locindex(loc) for loc in hidden)
+
+            for i in mines:
+                if self.tile(i).hidden: self.mark(i)
+            for i in safe:
+                if self.tile(i).hidden: self.reveal(i)
+
+            if not (safe or mines):
+                self.reveal(self.guess(constraints))
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+""" Memory-mapped library of Sudoku puzzles from large QQwing dumps.
+
+    The puzzle file is scanned once to build an index of line offsets, clue counts and difficulty
+    levels, which is saved beside the file (`<file>.idx`) and reused while the file is unchanged.
+    Puzzles are read from the memory-mapped file on demand, so picking a random puzzle is O(1) and
+    memory use does not depend on the size of the file.
+
+    Lines are expected to start with a puzzle in QQwing one-line format (81 characters, '.' or '0' for
+    blanks); an optional difficulty name may follow, e.g. as produced by `qqwing --csv`.
+
+    Run as a script to build the index and show a random puzzle:
+
+        puzzle_library.py puzzles.txt [difficulty] [min_clues]
+"""
+
+import os
+import sys
+import mmap
+import struct
+from array import array
+from random import randrange
+
+puzzle_len   = 81
+blanks       = b".0"
+difficulties = ("unknown", "simple", "easy", "intermediate", "expert")
+magic        = b"PBEIDX01"
+header       = struct.Struct("<8sQQd")     # magic, number of puzzles, source size, source mtime
+
+
+class PuzzleLibrary(object):
+    """ Puzzle file with offset index; `get(n)` returns n-th puzzle, `random()` a random one, optionally
+        filtered by difficulty name and minimum / maximum number of clues.
+    """
+    def __init__(self, fname):
+        self.fname   = fname
+        self.idxname = fname + ".idx"
+        self.filters = {}
+
+        if not self.load_index():
+            self.build_index()
+            self.save_index()
+
+        self.fp = open(fname, "rb")
+        self.mm = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ) if self.offsets else None
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def source_stamp(self):
+        st = os.stat(self.fname)
+        return st.st_size, st.st_mtime
+
+    def parse_line(self, line):
+        """Return (clues, difficulty code) for `line`, or None if it does not start with a puzzle."""
+        puzzle = line[:puzzle_len]
+        if len(puzzle) != puzzle_len or not all(c in b"0123456789." for c in set(puzzle)):
+            return None
+
+        rest       = line[puzzle_len:].lower()
+        difficulty = 0
+        for n, name in enumerate(difficulties):
+            if name.encode() in rest:
+                difficulty = n
+        clues = puzzle_len - sum(puzzle.count(b) for b in (b'.', b'0'))
+        return clues, difficulty
+
+    def build_index(self):
+        self.offsets    = array('Q')
+        self.clues      = array('B')
+        self.difficulty = array('B')
+        offset          = 0
+
+        with open(self.fname, "rb") as fp:
+            for line in fp:
+                info = self.parse_line(line)
+                if info:
+                    self.offsets.append(offset)
+                    self.clues.append(info[0])
+                    self.difficulty.append(info[1])
+                offset += len(line)
+
+    def save_index(self):
+        size, mtime = self.source_stamp()
+        try:
+            with open(self.idxname, "wb") as fp:
+                fp.write(header.pack(magic, len(self.offsets), size, mtime))
+                for arr in (self.offsets, self.clues, self.difficulty):
+                    arr.tofile(fp)
+        except (IOError, OSError):
+            pass    # read-only location: index will be rebuilt next time
+
+    def load_index(self):
+        """Load index if it exists and matches the puzzle file; return True on success."""
+        try:
+            with open(self.idxname, "rb") as fp:
+                mg, count, size, mtime = header.unpack(fp.read(header.size))
+                if mg != magic or (size, mtime) != self.source_stamp():
+                    return False
+
+                self.offsets, self.clues, self.difficulty = array('Q'), array('B'), array('B')
+                for arr in (self.offsets, self.clues, self.difficulty):
+                    arr.fromfile(fp, count)
+                return True
+        except (IOError, OSError, EOFError, struct.error):
+            return False
+
+    def get(self, n):
+        """Return `n`-th puzzle as a string."""
+        offset = self.offsets[n]
+        return self.mm[offset : offset + puzzle_len].decode("ascii")
+
+    def matching(self, difficulty=None, min_clues=0, max_clues=puzzle_len):
+        """Return array of puzzle numbers matching the filter; results are cached per filter."""
+        key = difficulty, min_clues, max_clues
+        if key not in self.filters:
+            code  = difficulties.index(difficulty.lower()) if difficulty else None
+            clues = self.clues
+            self.filters[key] = array('L', (n for n, d in enumerate(self.difficulty)
+                                            if (code is None or d == code) and min_clues <= clues[n] <= max_clues))
+        return self.filters[key]
+
+    def random(self, difficulty=None, min_clues=0, max_clues=puzzle_len):
+        """Return a random puzzle, optionally filtered by difficulty and number of clues."""
+        if difficulty or min_clues or max_clues != puzzle_len:
+            numbers = self.matching(difficulty, min_clues, max_clues)
+            if not numbers:
+                raise IndexError("no puzzles match the filter")
+            return self.get(numbers[randrange(len(numbers))])
+        return self.get(randrange(len(self.offsets)))
+
+    def close(self):
+        if self.mm: self.mm.close()
+        self.fp.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit()
+
+    library = PuzzleLibrary(sys.argv[1])
+    args    = sys.argv[2:]
+    print("%d puzzles" % len(library))
+    print(library.random(args[0] if args else None, int(args[1]) if len(args) > 1 else 0))
@@ -0,0 +1,116 @@
+# -*- encoding: utf-8 -*-
+
+""" Incremental terminal renderer for boards.
+
+    `DiffRenderer` keeps the previously drawn frame and on each draw writes only the cells that
+    changed, using ANSI cursor movement, in a single buffered write. The whole screen is redrawn on
+    the first draw and when the terminal size or the frame layout changes. Lines are laid out as
+    `BaseBoard.draw()` prints them, and cursor columns are counted in display width, so wide and
+    combining characters and ANSI colour codes in tiles keep the following cells in place.
+"""
+
+import re
+import sys
+from unicodedata import east_asian_width, combining
+from io import StringIO
+from contextlib import contextmanager
+from shutil import get_terminal_size
+
+from utils import range1, space, nl
+
+esc         = '\x1b['
+clear       = esc + "2J" + esc + "H"
+clear_eol   = esc + 'K'
+clear_below = esc + 'J'
+ansi_code   = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+
+
+def goto(row, col):
+    """ANSI code to move cursor to 0-indexed `row`, `col`."""
+    return "%s%d;%dH" % (esc, row+1, col+1)
+
+
+def width(text):
+    """Number of terminal columns taken by `text`."""
+    text = ansi_code.sub('', text)
+    return sum( 0 if combining(c) else (2 if east_asian_width(c) in "WF" else 1) for c in text )
+
+
+@contextmanager
+def captured_output():
+    out, sys.stdout = sys.stdout, StringIO()
+    try:
+        yield sys.stdout
+    finally:
+        sys.stdout = out
+
+
+class DiffRenderer(object):
+    """ Render `board` as a list of screen lines, each a list of text segments (row prefix, then one
+        segment per tile); status output is captured and added as one-segment lines.
+    """
+    def __init__(self, board, out=None):
+        self.board = board
+        self.out   = out or sys.stdout
+        self.last  = None
+        self.size  = None
+
+    def frame(self):
+        B     = self.board
+        tpl   = B.tiletpl
+        lines = []
+        pad   = [[]] * B.ypad
+        B.init_board()
+
+        # same text as `print()` of the arguments in `BaseBoard.draw()`, split into cells
+        if B.num_grid:
+            lines.append([space*(B.xpad + 4)] + [tpl % n + space for n in range1(B.width)])
+            lines.extend(pad)
+
+        for n, row in enumerate(B.board, 1):
+            if B.stackable:
+                row = [tile[-1] for tile in row]
+            prefix = space*2 + (tpl % n + space if B.num_grid else '')
+            lines.append([prefix] + [tpl % str(tile) + space for tile in row])
+            lines.extend(pad)
+
+        with captured_output() as status:
+            B.status()
+        lines.extend([line] for line in status.getvalue().split(nl))
+        return lines
+
+    def draw(self):
+        frame = self.frame()
+        size  = get_terminal_size()
+        last  = self.last
+
+        if last is None or size != self.size or len(last) != len(frame):
+            out = [clear] + [''.join(line) + nl for line in frame]
+        else:
+            out = [self.diff(n, old, new) for n, (old, new) in enumerate(zip(last, frame))]
+            out.append(goto(len(frame), 0) + clear_below)
+
+        self.out.write(''.join(out))
+        self.out.flush()
+        self.last, self.size = frame, size
+
+    def diff(self, row, old, new):
+        """Return ANSI output needed to update screen `row` from `old` to `new` segments."""
+        if len(old) != len(new):
+            return goto(row, 0) + ''.join(new) + clear_eol
+
+        out, col = [], 0
+        for n, (s1, s2) in enumerate(zip(old, new)):
+            w = width(s1)
+            if s1 != s2:
+                if w != width(s2):
+                    # layout of the rest of the line has shifted
+                    out.append(goto(row, col) + ''.join(new[n:]) + clear_eol)
+                    break
+                out.append(goto(row, col) + s2)
+            col += w
+        return ''.join(out)
+
+    def reset(self):
+        """Force full redraw on next draw."""
+        self.last = None
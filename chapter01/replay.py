@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+
+""" Record and replay board games.
+
+    `Recorder` seeds the random generator and writes a compact binary log of tile changes of a board
+    and of text input lines. The whole board is logged on first draw; after that, a change is logged
+    when a tile is set or moved on the board, and on each draw for tiles that changed in place. Each
+    draw also ends a move, so a move is everything that happened between two draws.
+    `Replay` reads the log, keeping a snapshot of the board every `snapshot_every` changes and the
+    number of changes at the end of each move, so seeking to any move only replays changes since the
+    nearest snapshot.
+
+    Log format: header (magic, seed, width, height), then records of one type byte and a payload:
+
+        T  <H length, utf-8 text    - new tile string, its code is the next free number
+        B  <H per cell              - whole board, written once before the first change
+        S  <IH flat index, code     - tile change
+        M                           - end of move (board drawn)
+        I  <H length, utf-8 text    - text input line
+
+    usage:
+        replay.py record log game.py [args]  - play game.py, recording the first board it creates
+        replay.py rerun log game.py [args]   - play game.py again with the recorded seed and input,
+                                               recording to log.rerun, and check that it matches
+        replay.py log [move]                 - show board after `move` moves (default: last)
+"""
+
+import sys
+import atexit
+import struct
+import random
+import runpy
+import builtins
+from array import array
+from time import time
+
+import board as board_module
+from utils import TextInput, space, nl
+
+magic          = b"PBELOG02"
+header         = struct.Struct("<8sQHH")    # magic, seed, width, height
+change         = struct.Struct("<IH")       # flat index, tile code
+length         = struct.Struct("<H")
+snapshot_every = 256
+
+
+class Recorder(object):
+    """Log changes of `board` and text input to `fname`; use `Recorder.attach()` to record only the first board."""
+    active = None
+
+    def __init__(self, board, fname, seed=None):
+        self.board   = board
+        self.seed    = random.randrange(2**63) if seed is None else seed
+        self.fp      = open(fname, "wb")
+        self.codes   = {}
+        self.state   = None     # tile codes as last logged
+        random.seed(self.seed)
+        self.fp.write(header.pack(magic, self.seed, board.width, board.height))
+
+        board.recorder     = self
+        TextInput.recorder = self
+        atexit.register(self.close)
+
+    @classmethod
+    def attach(cls, board, fname, seed=None):
+        if not cls.active:
+            cls.active = cls(board, fname, seed)
+        return cls.active
+
+    def code(self, tile):
+        key  = str(tile)
+        code = self.codes.get(key)
+        if code is None:
+            code = self.codes[key] = len(self.codes)
+            self.write_text(b'T', key)
+        return code
+
+    def write_text(self, rtype, text):
+        data = text.encode("utf-8")
+        self.fp.write(rtype + length.pack(len(data)) + data)
+
+    def start(self):
+        """Log the whole board; done on first draw, when the board is set up."""
+        self.state = array('H', [self.code(tile) for tile in self.board])
+        self.fp.write(b'B' + self.state.tobytes())
+
+    def set(self, loc, tile):
+        if self.state is None:
+            return
+        try:
+            code = self.code(tile)
+        except AttributeError:
+            return      # tile placing itself on the board before it's fully set up; logged by next sync()
+        self.log(loc.y*self.board.width + loc.x, code)
+
+    def log(self, i, code):
+        if self.state[i] != code:
+            self.state[i] = code
+            self.fp.write(b'S' + change.pack(i, code))
+
+    def sync(self):
+        """Log tiles that changed in place, e.g. flipped pieces or revealed cells, and end the move."""
+        if self.state is None:
+            self.start()
+        else:
+            for i, tile in enumerate(self.board):
+                self.log(i, self.code(tile))
+        self.fp.write(b'M')
+
+    def input(self, line):
+        self.write_text(b'I', line)
+
+    def close(self):
+        if not self.fp.closed:
+            self.fp.close()
+
+
+class Replay(object):
+    """ Recorded game read from `fname`; `seek_move(m)` returns tile codes of the board after move `m`
+        (0 is the board as first drawn), `seek(n)` after `n` changes; `frame(m)` the board after move `m`
+        as text; `moves` is the number of changes at the end of each move; `inputs` is a list of
+        (number of changes before, input line).
+    """
+    def __init__(self, fname, interval=snapshot_every):
+        with open(fname, "rb") as fp:
+            data = fp.read()
+
+        mg, self.seed, self.width, self.height = header.unpack_from(data)
+        if mg != magic:
+            raise ValueError("not a game log: %s" % fname)
+
+        self.interval  = interval
+        self.tiles     = []
+        self.inputs    = []
+        self.indexes   = array('L')
+        self.codes     = array('H')
+        self.moves     = array('L')
+        self.snapshots = []
+        self.load(data, header.size)
+        if not self.snapshots:
+            raise ValueError("no board record (B) in game log: %s" % fname)
+        self.state, self.pos = array('H', self.snapshots[0]), 0
+
+    def load(self, data, pos):
+        size, state = self.width * self.height, None
+
+        while pos < len(data):
+            rtype, pos = data[pos:pos+1], pos + 1
+            if rtype == b'M':
+                self.moves.append(len(self.codes))
+            elif rtype == b'S':
+                if state is None:
+                    raise ValueError("tile change before board record (B) in game log")
+                i, code = change.unpack_from(data, pos)
+                pos    += change.size
+                state[i] = code
+                self.indexes.append(i)
+                self.codes.append(code)
+                if len(self.codes) % self.interval == 0:
+                    self.snapshots.append(array('H', state))
+            elif rtype == b'B':
+                state = array('H')
+                state.frombytes(data[pos : pos + size*2])
+                pos  += size*2
+                self.snapshots.append(array('H', state))
+            else:
+                n,   = length.unpack_from(data, pos)
+                text = data[pos+length.size : pos+length.size+n].decode("utf-8")
+                pos += length.size + n
+                if rtype == b'T' : self.tiles.append(text)
+                else             : self.inputs.append((len(self.codes), text))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def seek(self, n):
+        """Return tile codes after `n` changes; replays at most `interval` changes."""
+        n = max(0, min(n, len(self)))
+        if not self.pos <= n < self.pos + self.interval:
+            self.pos   = n - n % self.interval
+            self.state = array('H', self.snapshots[n // self.interval])
+
+        state, indexes, codes = self.state, self.indexes, self.codes
+        for j in range(self.pos, n):
+            state[indexes[j]] = codes[j]
+        self.pos = n
+        return state
+
+    def seek_move(self, m):
+        """Return tile codes after move `m`."""
+        m = max(0, min(m, len(self.moves) - 1))
+        return self.seek(self.moves[m] if self.moves else len(self))
+
+    def frame(self, m):
+        tiles, state, w = self.tiles, self.seek_move(m), self.width
+        return nl.join( space + space.join(tiles[c] for c in state[y*w : (y+1)*w]) for y in range(self.height) )
+
+
+def play(game, args):
+    sys.argv = [game] + args
+    try:
+        runpy.run_path(game, run_name="__main__")
+    except (SystemExit, KeyboardInterrupt, EOFError):
+        pass
+
+def record(log, game, args, seed=None):
+    """Play `game` script recording to `log`; random generator is also seeded before the game starts."""
+    seed = random.randrange(2**63) if seed is None else seed
+    random.seed(seed)
+    board_module.record_file = log
+    board_module.record_seed = seed
+    play(game, args)
+    if Recorder.active: Recorder.active.close()
+
+def rerun(log, game, args):
+    """Play `game` with the seed and input of `log`; return True if the new log is identical."""
+    rep   = Replay(log)
+    lines = iter([line for _, line in rep.inputs])
+
+    def recorded_input(prompt=''):
+        line = next(lines, None)
+        if line is None: raise EOFError
+        return line
+
+    builtins.input = recorded_input
+    record(log + ".rerun", game, args, rep.seed)
+    with open(log, "rb") as fp1, open(log + ".rerun", "rb") as fp2:
+        return fp1.read() == fp2.read()
+
+
+if __name__ == "__main__":
+    sys.modules["replay"] = sys.modules[__name__]     # share `Recorder.active` with `board.py`
+    args = sys.argv[1:]
+    if not args:
+        print(__doc__)
+    elif args[0] == "record":
+        record(args[1], args[2], args[3:])
+    elif args[0] == "rerun":
+        print("identical" if rerun(args[1], args[2], args[3:]) else "logs differ")
+    else:
+        rep   = Replay(args[0])
+        start = time()
+        last  = max(0, len(rep.moves) - 1)
+        m     = min(int(args[1]), last) if len(args) > 1 else last
+        print(rep.frame(m))
+        print("%smove %d of %d, %d changes, %d inputs, seed %d (seek: %.2fms)" %
+              (nl, m, last, len(rep), len(rep.inputs), rep.seed, (time() - start) * 1000))
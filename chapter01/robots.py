@@ -2,11 +2,11 @@
 # -*- encoding: utf-8 -*-
 
 import sys
-from random import choice as rndchoice
-from random import randint
+from array import array
+from random import randint, randrange
 
-from utils import Loop, TextInput, sjoin, nl
-from board import Board, BaseTile
+from utils import Loop, TextInput, sjoin, first, nl
+from board import Board, BaseTile, GameOver
 
 
 size          = 15, 10
@@ -18,11 +18,18 @@ pause_time    = 0.2
 missile_pause = 0.03
 max_turns     = 25
 max_cmds      = 15
+ai_player     = False   # player's program is chosen randomly, like robots' programs
 
 chars         = dict(Player='☺', Missile='*', Rock='☗', Goal='⚑', Blank='.', Robot='♉')
 health_dict   = dict(Player=5, Robot=5, Missile=1, Rock=10, Goal=99)
 commands      = dict(m="move", t="turn_cw", T="turn_ccw", f="fire", w="wait", r="random")
 fullcmds      = list(commands.values())
+opcodes       = dict((cmd, n) for n, cmd in enumerate(fullcmds))
+
+
+def compile_program(cmds):
+    """Return program of opcodes (indexes in `fullcmds`) for a list of command names."""
+    return array('B', [opcodes[cmd] for cmd in cmds])
 
 
 class Tile(BaseTile):
@@ -54,12 +61,22 @@ class Mobile(Tile):
     def __init__(self, loc=None, direction=None):
         super(Mobile, self).__init__(loc)
         self.direction = direction or Loop(board.dirlist2, name="dir")
-        self.program   = []
+        self.program   = array('B')
+        self.pc        = 0                                          # program counter
+        self.ops       = [getattr(self, cmd) for cmd in fullcmds]   # dispatch table by opcode
+
+    def done(self):
+        return self.pc >= len(self.program)
+
+    def load(self, program):
+        self.program, self.pc = program, 0
 
     def go(self):
-        self.program = self.program or self.create_program()
-        cmd = getattr(self, self.program.pop(0))
-        cmd()
+        if self.done():
+            self.load(self.create_program())
+        op       = self.program[self.pc]
+        self.pc += 1
+        self.ops[op]()
         self.turn += 1
 
     def turn_cw(self)  : self.direction.next()
@@ -67,10 +84,15 @@ class Mobile(Tile):
     def wait(self)     : pass
 
     def random(self):
-        method = getattr(self, rndchoice(fullcmds))
-        method()
+        self.ops[randrange(len(self.ops))]()
 
     def fire(self):
+        if board.headless:
+            # nothing moves while a missile is in flight, so it hits the first non-blank tile on its way
+            target = first(t for t in board.ray(self, self.direction.dir) if not t.blank)
+            if target: Missile(direction=self.direction).hit(target)
+            return
+
         start = board.next_tile(self, self.direction.dir)
 
         if not start     : return
@@ -81,10 +103,10 @@ class Mobile(Tile):
         tile = board.next_tile(self, self.direction.dir)
 
         if tile and tile.blank : board.move(self, tile.loc)
-        else                   : self.program = []
+        else                   : self.pc = len(self.program)
 
     def create_program(self):
-        return [rndchoice(fullcmds)] * randint(1, 6)
+        return array('B', [randrange(len(fullcmds))]) * randint(1, 6)
 
 
 class Robot(Mobile):
@@ -144,7 +166,7 @@ class RBoard(Board):
     stat_sep = " | "
 
     def random_blank(self):
-        return rndchoice(self.locations("blank"))
+        return self.random_loc("blank")
 
     def status(self):
         print( nl, self.stat_sep.join(p.status() for p in players) )
@@ -156,8 +178,9 @@ class RobotsGame(object):
 
     def game_end(self, win):
         board.draw()
-        print( nl, self.winmsg if win else (self.losemsg % max_turns) )
-        sys.exit()
+        turns = max(p.turn for p in players) if players else None
+        winner = "player" if win else "robots"
+        board.game_over(self.winmsg if win else (self.losemsg % max_turns), winner=winner, turns=turns)
 
     def expand_program(self, cmds):
         L = []
@@ -170,7 +193,7 @@ class RobotsGame(object):
                 count, cmd = cmd, cmds.pop(0)
 
             L.extend( [commands[cmd]] * count )
-        return L
+        return compile_program(L)
 
 
 class BasicInterface(object):
@@ -184,10 +207,15 @@ class BasicInterface(object):
         while True:
             board.draw()
             for unit in players + robots:
-                cprog        = self.create_program if unit.player else unit.create_program
-                unit.program = unit.program or cprog()
+                if not unit.health: continue    # destroyed earlier in this turn
+                human        = unit.player and not ai_player
+                cprog        = self.create_program if human else unit.create_program
+                if unit.done():
+                    unit.load(cprog())
                 unit.go()
 
+            if not players: rgame.game_end(False)
+
     def create_program(self):
         while True:
             try:
@@ -197,8 +225,9 @@ class BasicInterface(object):
                 print(self.textinput.invalid_inp)
 
 
-if __name__ == "__main__":
-    board = RBoard(size, Blank, pause_time=pause_time)
+def new_game(**kwargs):
+    global board, rgame, players, robots, rocks
+    board = RBoard(size, Blank, index=("blank",), pause_time=pause_time, **kwargs)
 
     rgame   = RobotsGame()
     randloc = board.random_blank
@@ -208,5 +237,16 @@ if __name__ == "__main__":
 
     Goal(randloc())
 
+def run_headless():
+    """Play one game with a randomly programmed player without drawing; return the result (see `board.GameOver`)."""
+    global ai_player
+    ai_player = True
+    new_game(headless=True)
+    try                  : BasicInterface().run()
+    except GameOver as e : return e.result
+
+
+if __name__ == "__main__":
+    new_game()
     try                      : BasicInterface().run()
     except KeyboardInterrupt : sys.exit()
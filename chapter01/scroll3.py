@@ -3,42 +3,49 @@
 from __future__ import print_function, unicode_literals, division
 
 import sys
-from random import choice as rndchoice
+from random import Random, randrange, choice as rndchoice
 from time import sleep
+from collections import OrderedDict
 
-from utils import TextInput, Loop, ujoin, enumerate1, range1, first, envelope, space, nl
+from utils import TextInput, ujoin, enumerate1, range1, first, envelope, space, nl
 from utils import iround, sjoin
-from board import Loc, StackableBoard, BaseTile
-
-pause_time = 0.3
-blank      = '.'
-plchar     = '@'
-size       = 30, 20
-vsize      = 12, 10
-num_rocks  = 30
-rockchar   = '#'
-scrolltype = 1
-
-wrap       = True
-viswrap    = True
-out        = open("out", 'w')
-bufsize    = 3
-startloc   = 3, 3
+from board import Loc, BaseBoard, StackableBoard, BaseTile
+
+pause_time   = 0.3
+blank        = '.'
+plchar       = '@'
+size         = 30, 20
+vsize        = 12, 10
+num_rocks    = 30       # average number of rocks in the world, besides the top and left edges
+rockchar     = '#'
+scrolltype   = 1
+
+wrap         = True
+viswrap      = True
+debug        = False    # write scrolling debug lines to `out` file
+out          = open("out", 'w') if debug else None
+bufsize      = 3
+startloc     = 3, 3
+
+chunk_size   = 8        # world is stored in chunk_size x chunk_size chunks, created on first access
+max_chunks   = 16       # chunks kept in memory; least recently used chunks away from the viewport are evicted
+world_seed   = 0        # the same seed always generates the same world
+rand_tries   = 1000     # random locations tried by `rand_blank()` before scanning loaded chunks
 
 
 def topitems(iterable):
     return [x[-1] for x in iterable]
 
 def writeln(*args):
-    out.write(sjoin(args) + nl)
+    if out: out.write(sjoin(args) + nl)
 
 
 class Tile(BaseTile):
     blank = rock = player = False
 
-    def __init__(self, loc):
+    def __init__(self, loc, place=True):
         super(Tile, self).__init__(loc)
-        if loc: board[loc] = self
+        if loc and place: board[loc] = self
 
     def __repr__(self):
         return self.char
@@ -59,59 +66,182 @@ class Player(Tile):
             board.move(self, newloc)
 
 
+class ChunkStore(object):
+    """ Tile stacks of the world, split into `size` x `size` chunks.
+
+        A chunk is made by `generate(cx, cy)` (a list of base tiles, row by row) on first access. When
+        more than `max_chunks` chunks are loaded, least recently used chunks that are not `pinned` are
+        evicted; items placed on top of base tiles of an evicted chunk, and stacks whose base tile was
+        replaced or removed, are kept in `saved` and put back when the chunk is generated again. Base
+        tiles that were only changed in place are generated anew.
+    """
+    def __init__(self, size, generate, max_chunks):
+        self.size       = size
+        self.generate   = generate
+        self.max_chunks = max_chunks
+        self.chunks     = OrderedDict()     # (cx, cy): list of stacks, least recently used first
+        self.bases      = {}                # (cx, cy): generated base tiles of loaded chunks
+        self.saved      = {}                # (cx, cy): {stack index: (base replaced, items)}
+        self.pinned     = set()
+
+    def stack(self, x, y):
+        size  = self.size
+        key   = x // size, y // size
+        chunk = self.chunks.get(key)
+
+        if chunk is None : chunk = self.load(key)
+        else             : self.chunks.move_to_end(key)
+        return chunk[(y % size) * size + x % size]
+
+    def load(self, key):
+        base  = self.bases[key] = self.generate(*key)
+        chunk = [[tile] for tile in base]
+        for i, (replaced, items) in self.saved.pop(key, {}).items():
+            if replaced : chunk[i][:] = items
+            else        : chunk[i].extend(items)
+        self.chunks[key] = chunk
+        self.evict()
+        return chunk
+
+    def evict(self):
+        chunks = self.chunks
+        for key in list(chunks):
+            if len(chunks) <= self.max_chunks: break
+            if key not in self.pinned:
+                self.unload(key)
+
+    def loaded(self):
+        """Generate (x, y, stack) for all cells of loaded chunks, without changing the LRU order."""
+        size = self.size
+        for (cx, cy), chunk in list(self.chunks.items()):
+            for i, stack in enumerate(chunk):
+                yield cx*size + i % size, cy*size + i // size, stack
+
+    def unload(self, key):
+        base, items = self.bases.pop(key), {}
+        for i, stack in enumerate(self.chunks.pop(key)):
+            if not stack or stack[0] is not base[i] : items[i] = True, stack[:]
+            elif len(stack) > 1                     : items[i] = False, stack[1:]
+        if items: self.saved[key] = items
+
+
 class ScrollBoard(StackableBoard):
-    def __init__(self, size, vsize, def_tile, scrolltype, viswrap=False, bufsize=0):
-        super(ScrollBoard, self).__init__(size, def_tile)
+    """ Scrolling board of a world of `size` that is generated in chunks as it's explored (see
+        `ChunkStore`); only the `vsize` viewport is drawn, so memory use and drawing time don't depend
+        on the size of the world. For the same reason iterating over the board and tile / location
+        queries only cover loaded chunks, and the geometry tables of the whole world are not available.
+    """
+    def __init__(self, size, vsize, def_tile, scrolltype, viswrap=False, bufsize=0, seed=world_seed):
+        # tile stacks are kept in chunks instead of StackableBoard's list of rows
+        BaseBoard.__init__(self, size)
+        self.board_initialized    = True
+        self._def_tile_str        = False
+        self.def_tile             = def_tile
         self.vwidth, self.vheight = vsize
 
         self.scrolltype = scrolltype
         self.viswrap    = viswrap
         self.bufsize    = bufsize
-        self.vtopleft   = Loc(0,0)
+        self.seed       = seed
+        self.density    = num_rocks / (self.width * self.height)
         self.maxv_x     = self.width - self.vwidth
         self.maxv_y     = self.height - self.vheight
+        self.store      = ChunkStore(chunk_size, self.generate, max_chunks)
+        self.set_view(0, 0)
+
+    def generate(self, cx, cy):
+        """Return base tiles of chunk `cx`, `cy`: rocks along the top and left edges of the world and scattered randomly."""
+        rng, size = Random("%s %d %d" % (self.seed, cx, cy)), chunk_size
+        tiles     = []
+
+        for y in range(cy*size, (cy+1) * size):
+            for x in range(cx*size, (cx+1) * size):
+                rock = x == 0 or y == 0 or rng.random() < self.density
+                tiles.append( (Rock if rock else self.def_tile)(Loc(x, y), place=False) )
+        return tiles
+
+    def items(self, tile_loc):
+        loc = self.ploc(tile_loc)
+        return self.store.stack(loc.x, loc.y)
+
+    @property
+    def geometry(self):
+        raise NotImplementedError("ScrollBoard doesn't build neighbour / ray tables of the whole world")
+
+    def loc(self, x, y):
+        return Loc(x, y)
+
+    def loaded(self):
+        """Generate (location, stack) for loaded cells of the world."""
+        for x, y, stack in self.store.loaded():
+            if x < self.width and y < self.height:
+                yield Loc(x, y), stack
+
+    def __iter__(self):
+        return ( stack[-1] for _, stack in self.loaded() )
+
+    def locations(self, *attrs):
+        return [ loc for loc, stack in self.loaded() if all(getattr(stack[-1], attr) for attr in attrs) ]
+
+    def locations_not(self, *attrs):
+        return [ loc for loc, stack in self.loaded() if all(not getattr(stack[-1], attr) for attr in attrs) ]
+
+    def __getitem__(self, loc)            : return self.store.stack(loc.x, loc.y)[-1]
+    def __setitem__(self, tile_loc, item) : self.items(tile_loc).append(item)
+    def __delitem__(self, tile_loc)       : del self.items(tile_loc)[-1]
+
+    def nextloc(self, tile_loc, dir, n=1, wrap=False):
+        """Return location next to `tile_loc` point in direction `dir` without building geometry tables of the world."""
+        loc  = self.ploc(tile_loc)
+        x, y = loc.x + dir.x*n, loc.y + dir.y*n
+        if wrap:
+            x, y = x % self.width, y % self.height
+        loc = Loc(x, y)
+        return loc if self.valid(loc) else None
+
+    def set_view(self, x, y):
+        """Move the viewport to top left corner `x`, `y` and pin the chunks it shows."""
+        self.vtopleft = Loc(x, y)
+        size          = chunk_size
+        xs, ys        = self.view_coords()
+        cxs, cys      = set(x // size for x in xs), set(y // size for y in ys)
+        self.store.pinned = set( (cx, cy) for cx in cxs for cy in cys )
+
+    def view_coords(self):
+        """Return lists of world x and y coordinates shown in the viewport."""
+        x, y = self.vtopleft
+        xs   = [n % self.width for n in range(x, x + self.vwidth)]
+        ys   = [n % self.height for n in range(y, y + self.vheight)]
+        return xs, ys
 
     def draw(self):
-        if self.viswrap: self.viswrap_draw(); return
-
         print(nl*5)
-        for n, row in enumerate(self.board):
-            x, y = self.vtopleft
-            if y + self.vheight > n >= y:
-                print(space, ujoin( topitems(row[ x : x+self.vwidth ]) ))
-        sleep(pause_time)
-
-    def viswrap_draw(self):
-        print(nl*5)
-        # print("self.vtopleft.y", self.vtopleft.y)
-        rows = Loop(self.board, "row", index=self.vtopleft.y)
-
-        for _ in range(self.vheight):
-            cols = Loop(rows.row, index=self.vtopleft.x)
-            print(space, ujoin( topitems(cols.n_items(self.vwidth)) ))
-            rows.next()
-
+        xs, ys = self.view_coords()
+        stack  = self.store.stack
+        for y in ys:
+            print(space, ujoin( [stack(x, y)[-1] for x in xs] ))
         sleep(pause_time)
 
     def rand_blank(self):
-        return rndchoice(self.tiles("blank"))
+        """Return random blank tile, or None if there are none in the world as far as it's loaded."""
+        for _ in range(rand_tries):
+            loc = Loc(randrange(self.width), randrange(self.height))
+            if self[loc].blank:
+                return self[loc]
+        locs = self.locations("blank")
+        return self[rndchoice(locs)] if locs else None
 
     def center_on(self, item_loc):
         loc        = self.ploc(item_loc)
         halfwidth  = iround(self.vwidth / 2)
         halfheight = iround(self.vheight / 2)
+        x, y       = loc.x - halfwidth, loc.y - halfheight
 
-        if self.viswrap:
-            x = Loop(range(self.width), index=loc.x)
-            y = Loop(range(self.height), index=loc.y)
-            x = x.prev(halfwidth)
-            y = y.prev(halfheight)
-        else:
-            x, y = loc.x - self.halfwidth, loc.y - self.halfheight
-            x, y = max(0, x), max(0, y)
+        if self.viswrap : x, y = x % self.width, y % self.height
+        else            : x, y = envelope(x, 0, self.maxv_x), envelope(y, 0, self.maxv_y)
 
         writeln(self.vtopleft, loc)
-        self.vtopleft = Loc(x, y)
+        self.set_view(x, y)
         writeln(self.vtopleft); writeln()
 
     def move(self, item, newloc):
@@ -138,7 +268,7 @@ class ScrollBoard(StackableBoard):
         elif newloc.y >= y + self.vheight:
             y = min(y + self.vheight - bufsize, self.height - self.vheight)
 
-        self.vtopleft = Loc(x, y)
+        self.set_view(x, y)
         writeln(maxx, self.vtopleft); writeln()
 
     def scroll2(self, loc, newloc):
@@ -177,8 +307,5 @@ if __name__ == "__main__":
     board  = ScrollBoard(size, vsize, Blank, scrolltype, viswrap=viswrap, bufsize=bufsize)
     player = Player(Loc(*startloc))
     # board.center_on(player)
-    for _ in range(num_rocks): Rock(board.rand_blank())
-    for x in range(size[0]): Rock(Loc(x, 0))
-    for y in range(size[1]): Rock(Loc(0, y))
 
     Test().run()
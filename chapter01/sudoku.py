@@ -5,17 +5,24 @@ from random import choice as rndchoice
 
 from utils import enumerate1, sjoin, TextInput, space, nl
 from board import Board, Loc, BaseTile
+from sudoku_solver import SudokuGrid
+from puzzle_library import PuzzleLibrary
 
-size    = 9
-blank   = '.'
-tiletpl = '%2s'
-rng3    = range(3)
-rng9    = range(9)
-offsets = (0, 3, 6)
+size     = 9
+blank    = '.'
+tiletpl  = '%2s'
+rng3     = range(3)
+rng9     = range(9)
+offsets  = (0, 3, 6)
+hint_key = 'h'
 
 # in the format produced by QQwing program; just one puzzle for testing
 puzzles    = [".13.....22.....48....7...19...9..8..7......2....3.......263.9..4.9.7.6....149...8"]
 
+# pick puzzles from a QQwing dump instead, see `puzzle_library.py`; can also be given as an argument
+puzzle_file = None
+difficulty  = None
+
 
 class Tile(BaseTile):
     initial = blank = False
@@ -35,12 +42,15 @@ class Initial(Number) : pass
 
 
 class SudokuBoard(Board):
+    """Sudoku board; `grid` keeps used digit bitmasks for rows, columns and regions, see `SudokuGrid`."""
+
     def __init__(self, size, def_tile, puzzle):
         super(SudokuBoard, self).__init__(size, def_tile)
+        self.grid = SudokuGrid()
 
-        for tile, val in zip(self, puzzle):
+        for loc, val in zip(self.geometry.locs, puzzle):
             if val != blank:
-                self[tile] = Initial(val)
+                self[loc] = Initial(val)
 
         self.regions = [self.make_region(xo, yo) for xo in offsets for yo in offsets]
 
@@ -49,6 +59,14 @@ class SudokuBoard(Board):
             lines.extend(( [Loc(x, n) for x in rng9], [Loc(n, y) for y in rng9] ))
         self.lines = lines
 
+    def __setitem__(self, tile_loc, tile):
+        i = self.locindex(self.ploc(tile_loc))
+        if self.grid.cells[i]:
+            self.grid.remove(i)
+        if tile.num:
+            self.grid.place(i, tile.num)
+        super(SudokuBoard, self).__setitem__(tile_loc, tile)
+
     def make_region(self, xo, yo):
         """Make one region at x offset `xo` and y offset `yo`."""
         return [ Loc(xo + x, yo + y) for x in rng3 for y in rng3 ]
@@ -67,15 +85,22 @@ class SudokuBoard(Board):
 
 
 class Sudoku(object):
-    winmsg = "Solved!"
+    winmsg  = "Solved!"
+    hintmsg = "Hint: %d at %d,%d"
+    nohint  = "No hint: there is a mistake on the board"
 
     def valid_move(self, loc, val):
         if board[loc].initial: return False
+        return board.grid.valid(board.locindex(loc), val)
 
-        for reg_line in board.lines + board.regions:
-            if loc in reg_line and val in (board[loc] for loc in reg_line):
-                return False
-        return True
+    def hint(self):
+        """Return message with the solution for a random blank location."""
+        solution = board.grid.solve()
+        if not solution:
+            return self.nohint
+
+        loc = rndchoice(board.locations("blank"))
+        return self.hintmsg % (solution.cells[board.locindex(loc)], loc.x+1, loc.y+1)
 
     def check_end(self):
         if not any(t.blank for t in board):
@@ -85,7 +110,7 @@ class Sudoku(object):
 
 class BasicInterface(object):
     def run(self):
-        self.textinput = TextInput("loc %d", board)
+        self.textinput = TextInput(["loc %d", hint_key], board)
 
         while True:
             board.draw()
@@ -96,12 +121,20 @@ class BasicInterface(object):
     def get_move(self):
         while True:
             cmd = self.textinput.getinput()
-            if sudoku.valid_move(*cmd) : return cmd
-            else                       : print(self.textinput.invalid_move)
+            if cmd == [hint_key]         : print(sudoku.hint())
+            elif sudoku.valid_move(*cmd) : return cmd
+            else                         : print(self.textinput.invalid_move)
+
+
+def get_puzzle():
+    fname = sys.argv[1] if len(sys.argv) > 1 else puzzle_file
+    if fname:
+        return PuzzleLibrary(fname).random(difficulty)
+    return rndchoice(puzzles)
 
 
 if __name__ == "__main__":
-    board  = SudokuBoard(size, Blank, rndchoice(puzzles))
+    board  = SudokuBoard(size, Blank, get_puzzle())
     sudoku = Sudoku()
 
     try: BasicInterface().run()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+
+""" Sudoku grid with bitmask candidate sets, and a constraint propagation solver.
+
+    Each row, column and 3x3 box keeps a bitmask of used digits (bit `d` for digit d), so checking
+    if a digit can be placed is a few integer operations. The solver fills naked singles (cells with
+    one candidate) and hidden singles (digits with one possible cell in a row, column or box), then
+    searches depth-first, branching on the cell with the fewest candidates.
+
+    Run as a script to solve and validate a file of puzzles in QQwing format, one per line:
+
+        sudoku_solver.py puzzles.txt
+"""
+
+import sys
+from time import time
+
+from utils import first
+
+blanks    = ".0"
+alldigits = 0b1111111110    # bits 1-9
+rng9      = range(9)
+rng81     = range(81)
+
+row_of    = [i // 9 for i in rng81]
+col_of    = [i % 9 for i in rng81]
+box_of    = [(i // 27) * 3 + (i % 9) // 3 for i in rng81]
+units     = ( [[r*9 + c for c in rng9] for r in rng9] +
+              [[r*9 + c for r in rng9] for c in rng9] +
+              [[i for i in rng81 if box_of[i] == b] for b in rng9] )
+digit_of  = dict((1 << d, d) for d in range(1, 10))
+popcount  = [bin(m).count('1') for m in range(1024)]
+
+
+class Contradiction(Exception):
+    pass
+
+
+def bits(mask):
+    """Generate single-bit masks of `mask`."""
+    while mask:
+        low = mask & -mask
+        yield low
+        mask ^= low
+
+def parse(puzzle):
+    """Return list of 81 cell values (0 for blank) from QQwing format `puzzle` string."""
+    puzzle = puzzle.strip()
+    if len(puzzle) != 81:
+        raise ValueError("puzzle must have 81 cells: %r" % puzzle)
+    return [0 if c in blanks else int(c) for c in puzzle]
+
+
+class SudokuGrid(object):
+    """9x9 grid of digits (0 for blank) with used-digit bitmasks for rows, columns and boxes."""
+
+    def __init__(self, cells=None):
+        """Place given `cells`; raise ValueError if a given digit is already used in its row, column or box."""
+        self.cells = [0] * 81
+        self.rows  = [0] * 9
+        self.cols  = [0] * 9
+        self.boxes = [0] * 9
+        for i, d in enumerate(cells or ()):
+            if not d:
+                continue
+            if not self.valid(i, d):
+                raise ValueError("invalid puzzle: %d at row %d, column %d is already used" % (d, row_of[i]+1, col_of[i]+1))
+            self.place(i, d)
+
+    def copy(self):
+        grid       = SudokuGrid.__new__(SudokuGrid)
+        grid.cells = self.cells[:]
+        grid.rows  = self.rows[:]
+        grid.cols  = self.cols[:]
+        grid.boxes = self.boxes[:]
+        return grid
+
+    def __str__(self):
+        return ''.join(str(d) if d else '.' for d in self.cells)
+
+    def candidates(self, i):
+        """Bitmask of digits that can be placed in blank cell `i`."""
+        return alldigits & ~(self.rows[row_of[i]] | self.cols[col_of[i]] | self.boxes[box_of[i]])
+
+    def valid(self, i, d):
+        """Can digit `d` be placed in cell `i`, i.e. is it not used in the cell's row, column and box?"""
+        return not (self.rows[row_of[i]] | self.cols[col_of[i]] | self.boxes[box_of[i]]) & (1 << d)
+
+    def place(self, i, d):
+        bit = 1 << d
+        self.cells[i] = d
+        self.rows[row_of[i]]  |= bit
+        self.cols[col_of[i]]  |= bit
+        self.boxes[box_of[i]] |= bit
+
+    def remove(self, i):
+        mask = ~(1 << self.cells[i])
+        self.cells[i] = 0
+        self.rows[row_of[i]]  &= mask
+        self.cols[col_of[i]]  &= mask
+        self.boxes[box_of[i]] &= mask
+
+    def propagate(self):
+        """ Fill naked and hidden singles until none are left; return dict of candidate masks of
+            remaining blank cells; raise Contradiction if the grid can't be solved.
+        """
+        cells, rows, cols, boxes = self.cells, self.rows, self.cols, self.boxes
+        masks  = rows, cols, boxes
+        blanks = [i for i in rng81 if not cells[i]]
+        cands  = [0] * 81
+
+        while True:
+            progress = False
+            left     = []
+            for i in blanks:
+                if cells[i]:
+                    continue
+                r, c, b = row_of[i], col_of[i], box_of[i]
+                cand    = alldigits & ~(rows[r] | cols[c] | boxes[b])
+                if not cand:
+                    raise Contradiction
+                if not cand & (cand - 1):
+                    cells[i] = digit_of[cand]
+                    rows[r] |= cand; cols[c] |= cand; boxes[b] |= cand
+                    cands[i] = 0
+                    progress = True
+                else:
+                    cands[i] = cand
+                    left.append(i)
+            blanks = left
+            if progress:
+                continue
+
+            for k, unit in enumerate(units):
+                used = masks[k // 9][k % 9]
+                if used == alldigits:
+                    continue
+                once = twice = 0
+                for i in unit:
+                    cand   = cands[i]
+                    twice |= once & cand
+                    once  |= cand
+                if (once | used) != alldigits:
+                    raise Contradiction
+
+                for bit in bits(once & ~twice & ~used):
+                    i = first(i for i in unit if cands[i] & bit)
+                    if i is None or not self.valid(i, digit_of[bit]):
+                        raise Contradiction
+                    self.place(i, digit_of[bit])
+                    cands[i] = 0
+                    progress = True
+
+            if not progress:
+                return dict((i, cands[i]) for i in blanks)
+
+    def solve(self):
+        """Return solved copy of the grid, or None if there is no solution."""
+        grid = self.copy()
+        try:
+            candidates = grid.propagate()
+        except Contradiction:
+            return None
+
+        if not candidates:
+            return grid
+
+        i = min(candidates, key=lambda i: popcount[candidates[i]])
+        for bit in bits(candidates[i]):
+            guess = grid.copy()
+            guess.place(i, digit_of[bit])
+            solved = guess.solve()
+            if solved:
+                return solved
+
+    def solved(self):
+        """Is the grid completely and correctly filled?"""
+        return all(m == alldigits for m in self.rows + self.cols + self.boxes) and all(self.cells)
+
+
+def solve_file(fname):
+    """Solve and validate all puzzles in `fname`, return (number solved, number failed, seconds)."""
+    solved = failed = 0
+    start  = time()
+
+    with open(fname) as fp:
+        for line in fp:
+            line = line.strip()
+            if len(line) != 81: continue
+
+            cells = parse(line)
+            try:
+                solution = SudokuGrid(cells).solve()
+            except ValueError as e:
+                failed += 1; print("%s: %s" % (e, line))
+                continue
+            ok       = solution and solution.solved() and \
+                       all(not c or c == s for c, s in zip(cells, solution.cells))
+            if ok : solved += 1
+            else  : failed += 1; print("failed:", line)
+
+    return solved, failed, time() - start
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit()
+
+    solved, failed, sec = solve_file(sys.argv[1])
+    total = solved + failed
+    print("%d puzzles, %d solved, %d failed in %.2fs, %.0f puzzles/s" %
+          (total, solved, failed, sec, total / (sec or 1)))
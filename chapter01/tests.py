@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+
+""" Tests for chapter01 modules:
+
+    DiffRendererTest - a screen updated by diffed draws has to look the same as a full redraw, and a
+                       full redraw the same as the text printed by `BaseBoard.draw()`
+    VersiEngineTest  - the bitboard Versi engine has to give the same moves, captures and scores as
+                       the tile-based one
+
+    usage: python -m unittest tests
+"""
+
+import re
+import unittest
+from io import StringIO
+from random import seed, shuffle
+
+import versi
+from board import Board, Loc
+from render import DiffRenderer, captured_output, width, nl
+from utils import first
+
+sgr   = '\x1b[31m'
+reset = '\x1b[0m'
+
+
+class Screen(object):
+    """Minimal terminal: applies text, cursor moves and the clear codes used by `render`."""
+    code = re.compile(r"\x1b\[([0-9;?]*)([A-Za-z])")
+
+    def __init__(self):
+        self.rows     = {}
+        self.row      = self.col = 0
+        self.attached = ''
+
+    def cell(self, row, col):
+        return self.rows.setdefault(row, {}).get(col)
+
+    def write(self, text):
+        pos = 0
+        for m in self.code.finditer(text):
+            self.put(text[pos:m.start()])
+            self.command(*m.groups(), seq=m.group(0))
+            pos = m.end()
+        self.put(text[pos:])
+
+    def flush(self):
+        pass
+
+    def command(self, args, cmd, seq):
+        row = self.rows.setdefault(self.row, {})
+        if cmd == 'H':
+            r, c = (args.split(';') + ['1'])[:2] if args else ('1', '1')
+            self.row, self.col = int(r) - 1, int(c) - 1
+        elif cmd == 'J' and args == '2':
+            self.rows = {}
+        elif cmd == 'J':
+            self.rows = dict((r, cells) for r, cells in self.rows.items() if r < self.row)
+            self.rows[self.row] = dict((c, v) for c, v in row.items() if c < self.col)
+        elif cmd == 'K':
+            self.rows[self.row] = dict((c, v) for c, v in row.items() if c < self.col)
+        else:
+            self.attached += seq        # colour: kept with the next printed character
+
+    def put(self, text):
+        for char in text:
+            if char == nl:
+                self.row, self.col = self.row + 1, 0
+                continue
+            row = self.rows.setdefault(self.row, {})
+            w   = width(char)
+            if not w:
+                row[self.col - 1] = (row.get(self.col - 1) or '') + char
+                continue
+            row[self.col]  = self.attached + char
+            self.attached  = ''
+            for n in range(1, w):
+                row[self.col + n] = ''
+            self.col += w
+
+    def lines(self):
+        last = max([r for r, cells in self.rows.items() if cells] or [-1])
+        return [ ''.join(v for c, v in sorted(self.rows.get(r, {}).items())) for r in range(last + 1) ]
+
+
+class DiffRendererTest(unittest.TestCase):
+    tiles = ['x', '口', 'é', sgr + 'o' + reset, '.']
+
+    def make_board(self, num_grid=True, padding=(2, 1)):
+        return Board((5, 4), '.', num_grid=num_grid, padding=padding, pause_time=0, diff_render=False)
+
+    def full(self, board):
+        screen   = Screen()
+        renderer = DiffRenderer(board, screen)
+        renderer.draw()
+        return screen.lines()
+
+    def check_updates(self, board):
+        screen   = Screen()
+        renderer = DiffRenderer(board, screen)
+        renderer.draw()
+        for n, tile in enumerate(self.tiles * 3):
+            board[Loc(n % board.width, n * 3 % board.height)] = tile
+            renderer.draw()
+            self.assertEqual(screen.lines(), self.full(board))
+
+    def test_diff_matches_full_redraw(self):
+        self.check_updates(self.make_board())
+
+    def test_diff_without_grid(self):
+        self.check_updates(self.make_board(num_grid=False, padding=(0, 0)))
+
+    def test_width(self):
+        self.assertEqual(width('口'), 2)
+        self.assertEqual(width('é'), 1)
+        self.assertEqual(width(sgr + 'o' + reset), 1)
+
+    def test_frame_matches_draw(self):
+        for num_grid in (True, False):
+            board = self.make_board(num_grid)
+            board[Loc(1, 1)] = '口'
+            with captured_output() as out:
+                board.draw()
+            printed = out.getvalue().split(nl)[board.screen_sep + 1:]
+            frame   = [''.join(line) for line in DiffRenderer(board, StringIO()).frame()]
+            self.assertEqual(printed, frame)
+
+
+class VersiEngineTest(unittest.TestCase):
+    games = 10
+
+    def new_game(self, board_class, size):
+        """Set up `versi` module globals for a new game on `board_class` board; return first player."""
+        versi.board   = board_class(size, versi.Blank, index=("blank",))
+        versi.players = [versi.Player(c) for c in versi.player_chars]
+        versi.player1, versi.player2 = versi.players
+        versi.versi   = versi.Versi()
+        return versi.player1
+
+    def play(self, board_class, size, game):
+        """Play random game number `game`; return list of (player, valid moves, captures) and the scores."""
+        seed(game)
+        player, moves = self.new_game(board_class, size), []
+        board         = versi.board
+        while True:
+            valid = board.get_valid_moves(player)
+            if not valid:
+                player = player.enemy()
+                if not board.get_valid_moves(player): break
+                continue
+
+            captured = dict( (loc.loc, sorted(t.loc.loc for t in board.get_captured(player, loc))) for loc in valid )
+            moves.append((player.char, sorted(l.loc for l in valid), sorted(captured.items())))
+            shuffle(valid)
+            player.make_move(first(valid))
+            player = player.enemy()
+        return moves, versi.player1.score(), versi.player2.score()
+
+    def test_engines_match(self):
+        for size in ((6, 6), (8, 8), (5, 7)):
+            for game in range(self.games):
+                tiles = self.play(versi.VersiBoard, size, game)
+                bits  = self.play(versi.BitVersiBoard, size, game)
+                self.assertEqual(tiles, bits, "engines differ in game %d on %dx%d board" % ((game,) + size))
+
+
+if __name__ == "__main__":
+    unittest.main()
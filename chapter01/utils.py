@@ -3,7 +3,6 @@
 
 import sys
 import re
-from copy import copy
 from random import randint, shuffle
 from itertools import zip_longest, takewhile
 
@@ -96,19 +95,26 @@ class Loop(object):
 class AttrToggles(object):
     """ Inverse-toggle two boolean attributes when one of a pair is toggled; `attribute_toggles`
         is a list of tuples.
+
+        If the object is on a board with a tile index (see `board.TileIndex`), the index is updated
+        after each attribute change.
     """
     attribute_toggles = []
+    tile_index        = None
 
     def __setattr__(self, attr, val):
         object.__setattr__(self, attr, val)
-        toggles = self.attribute_toggles
+        changed = [attr]
+
+        for attrs in self.attribute_toggles:
+            if attr in attrs:
+                for a in attrs:
+                    if a != attr:
+                        object.__setattr__(self, a, not val)
+                        changed.append(a)
 
-        if attr in flatten(toggles):
-            for attrs in toggles:
-                if attr in attrs:
-                    attrs = set(attrs) - set([attr])
-                    for attr in attrs:
-                        object.__setattr__(self, attr, not val)
+        if self.tile_index and attr != "tile_index":
+            self.tile_index.update(self, changed)
 
 
 class Dice(object):
@@ -124,6 +130,86 @@ class Dice(object):
         return sum(self.roll())
 
 
+class FormatParser(object):
+    """ Parser of input in one `TextInput` format; the regex matching the whole input and the regex
+        and converter for each format code are compiled once. Use `format_parser()` to get a cached
+        parser.
+    """
+    converters = {"%d": int, "%hd": lambda n: int(n) - 1, "%f": float, "%s": str}
+
+    def __init__(self, fmt):
+        regexes = TextInput.regexes
+        pattern = fmt
+        for init, repl in regexes:
+            pattern = pattern.replace(init, repl)
+
+        self.fmt   = fmt
+        self.regex = re.compile("^%s$" % pattern)
+        self.codes = []     # (code, optional, regex, converter)
+
+        for code in fmt.split():
+            optional = code.endswith('?')
+            if optional: code = code[:-1]
+            regex = re.compile( "^%s$" % dict(regexes).get(code, code) )
+            self.codes.append( (code, optional, regex, self.converters.get(code, str)) )
+
+    def match(self, inp):
+        return self.regex.match(inp)
+
+    def parse(self, inp, explicit_split=True, board=None):
+        """ Parse list of input tokens `inp` (words if `explicit_split`, otherwise characters); return
+            list of values; locations are checked using `board.valid()`.
+        """
+        from board import Loc
+
+        inp      = list(inp)
+        commands = []
+
+        for code, optional, regex, convert in self.codes:
+            if not inp:
+                if optional: continue
+                else: raise ValueError
+
+            if code == "loc":
+                if optional and not regex.match(ujoin(inp[:2])):
+                    continue
+                x, y = inp.pop(0), inp.pop(0)
+                loc  = Loc( int(x)-1, int(y)-1 )
+                if board and not board.valid(loc):
+                    raise IndexError
+                commands.append(loc)
+                continue
+
+            if optional and not regex.match(first(inp)):
+                continue
+
+            if explicit_split:
+                val = inp.pop(0)
+            else:
+                if code in ("%d", "%hd"):
+                    val = ''.join(takewhile(str.isdigit, inp))
+                else:
+                    val = ''
+                    for x in inp:
+                        if not regex.match(val + x): break
+                        val += x
+                inp = inp[len(val):]
+            commands.append(convert(val))
+
+        if inp: raise ValueError
+        return commands
+
+
+format_parsers = {}
+
+def format_parser(fmt):
+    """Return shared `FormatParser` for `fmt`, compiling it on first use."""
+    parser = format_parsers.get(fmt)
+    if not parser:
+        parser = format_parsers[fmt] = FormatParser(fmt)
+    return parser
+
+
 class TextInput(object):
     """ Get text input from user in a specified format `fmt`.
         Given format "loc %d", both inputs are valid: "332", "3 3 2"; when input is ambiguous, values
@@ -144,6 +230,7 @@ class TextInput(object):
     formats        = ("loc",)
     choice_tpl     = "%2d) %s"
     explicit_split = True       # input contained spaces & it was possible to explicitly split values
+    recorder       = None       # set by `replay.Recorder` to log input lines
 
     # needs to be in precise order for matchfmt() method
     regexes     = (
@@ -175,6 +262,7 @@ class TextInput(object):
         self.accept_blank    = accept_blank
         self.singlechar_cmds = singlechar_cmds
         self.invalid_inp     = invalid_inp or self.invalid_inp
+        self.parsers         = dict( (fmt, format_parser(fmt)) for fmt in formats or () )
 
     def getloc(self):
         return first( self.getinput(formats=["loc"]) )
@@ -203,105 +291,55 @@ class TextInput(object):
             try: return self.parse_input(formats)
             except (IndexError, ValueError, TypeError, KeyError) as e: print(self.invalid_inp)
 
+    def parser(self, fmt):
+        return self.parsers.get(fmt) or format_parser(fmt)
+
     def matchfmt(self, fmt, inp):
-        for init, repl in self.regexes:
-            fmt = fmt.replace(init, repl)
-        return re.match("^%s$" % fmt, inp)
+        return self.parser(fmt).match(inp)
 
     def parse_fmt(self, inp, fmt):
         """Attempt to parse `inp` using `fmt` format; return False if there is mismatch."""
-        from board import Loc
-
-        fmt      = fmt.split()
-        inp      = copy(inp)
-        commands = []
-        handlers = {"%d": int, "%f": float, "%s": str}
-        regexes  = dict(self.regexes)
-        isdigit  = lambda x: x.isdigit()
-
-        def nomatch(val): return bool( optional and not re.match(regex, val) )
-
-        for n, code in enumerate(fmt):
-            optional = code.endswith('?')
-            if optional: code = code[:-1]
-            regex    = "^%s$" % regexes.get(code, code)
-
-            if not inp:
-                if optional: continue
-                else: raise ValueError
-
-            if code == "loc":
-
-                if nomatch( ujoin(inp[:2]) ):
-                    continue
-                else:
-                    # print("inp", inp)
-                    x, y = inp.pop(0), inp.pop(0)
-                    loc = Loc( int(x)-1, int(y)-1 )
-                    if self.board and not self.board.valid(loc):
-                        raise IndexError
-                    commands.append(loc)
-
-            # int and 'human format' (1-indexed) int
-            elif code in ("%d", "%hd"):
-                if nomatch(first(inp)):
-                    continue
-                else:
-                    if self.explicit_split:
-                        n = inp.pop(0)
-                    else:
-                        n = list(takewhile(isdigit, iter(inp)))
-                        n = sjoin(n, '')
-                        inp = inp[len(n):]
-                    n = int(n) if code=="%d" else int(n)-1
-                    commands.append(n)
-
-            else:
-                if nomatch(first(inp)) :
-                    continue
-                else:
-                    if self.explicit_split:
-                        val = inp.pop(0)
-                    else:
-                        val = []
-
-                        def match(x):
-                            pat = sjoin(val, sep='') + x
-                            if re.match(regex, pat):
-                                val.append(x)
-                                return True
-
-                        val = list(takewhile(match, iter(inp)))
-                        val = sjoin(val, '')
-                        inp = inp[len(val):]
-
-                    commands.append( handlers.get(code, str)(val) )
-
-        if inp: raise ValueError
-        return commands
+        return self.parser(fmt).parse(inp, self.explicit_split, self.board)
 
     def parse_input(self, formats):
-        inp = input(self.prompt).strip()
+        line = input(self.prompt)
+        if self.recorder: self.recorder.input(line)
+        return self.parse(line, formats)
+
+    def parse(self, inp, formats=None):
+        """ Parse one line of input `inp` using the first of `formats` (by default `self.formats`) that
+            matches it; raise ValueError, IndexError, etc. if it's invalid, like `parse_input()`.
+        """
+        inp = inp.strip()
         if inp == self.quit_key: sys.exit()
         if self.accept_blank and not inp:
             return None
 
-        formats = [fmt for fmt in formats if self.matchfmt(fmt, inp)]
-        if not formats:
+        parser = first(p for p in map(self.parser, formats or self.formats) if p.match(inp))
+        if not parser:
             raise ValueError
 
-        fmt = first(formats)
         if self.singlechar_cmds:
             inp = inp.replace(space, '')
 
-        if space in inp:
-            inp = inp.split()
-        else:
-            inp = list(inp)
-            self.explicit_split = False
-
-        commands = self.parse_fmt(inp, fmt)
-        return commands
+        self.explicit_split = space in inp
+        inp = inp.split() if self.explicit_split else list(inp)
+        return parser.parse(inp, self.explicit_split, self.board)
+
+    def parse_many(self, lines, formats=None, skip_invalid=False):
+        """ Parse a stream of input `lines` (e.g. recorded commands) without prompting; return list of
+            results. Parsing stops at the quit key; invalid lines raise an exception, or are skipped if
+            `skip_invalid` is set, as the interactive input loop would do.
+        """
+        results = []
+        for line in lines:
+            if line.strip() == self.quit_key:
+                break
+            try:
+                results.append(self.parse(line, formats))
+            except (IndexError, ValueError, TypeError, KeyError):
+                if not skip_invalid: raise
+        return results
 
     def menu(self, choices):
         for n, (title, _) in enumerate1(choices):
@@ -6,8 +6,10 @@ from random import choice as rndchoice
 from random import shuffle
 from itertools import takewhile, groupby
 
-from utils import TextInput, nextval, nl, first, cmp, iround, nextitem, getitem, nextgroup, flatten
-from board import Board, Loc, BaseTile
+from utils import TextInput, nextval, first, cmp, iround, nextitem, getitem, nextgroup, flatten
+from board import Board, Loc, BaseTile, GameOver
+from bitboard import BitBoard
+from versi_ai import AlphaBeta
 
 size         = 6, 6
 player_chars = '▣⎔'
@@ -16,6 +18,11 @@ ai_players   = '⎔'
 blank        = '.'
 padding      = 4, 2
 pause_time   = 0.3
+bitboard     = True     # use bitboard engine for move generation
+ai_search    = True     # use alpha-beta search AI (requires bitboard engine)
+search_time  = pause_time
+headless_search = 0.005, 2      # search time (s) and depth limit per move in headless games
+headless_openings = 4           # random moves at the start of headless games, so that games differ
 
 
 class PlayerBase(object):
@@ -49,7 +56,7 @@ class VersiBoard(Board):
     scores_msg = "%s  score: %3s    %s  score: %3s"
 
     def get_valid_moves(self, player):
-        return [loc for loc in self.locations() if self.valid_move(player, loc)]
+        return [loc for loc in self.locations("blank") if self.valid_move(player, loc)]
 
     def valid_move(self, player, loc):
         return bool(self.get_captured(player, loc))
@@ -80,15 +87,64 @@ class VersiBoard(Board):
     def middle(self):
         return iround(self.width/2) - 1, iround(self.height/2) - 1
 
+    def score(self, player):
+        return sum(tile==player for tile in self)
+
+    def num_pieces(self):
+        return sum(self.score(p) for p in players)
+
+
+class BitVersiBoard(VersiBoard):
+    """ VersiBoard that answers move and capture queries using `BitBoard` masks; the masks are rebuilt
+        from tiles after the board changes (i.e. once per move), tiles remain the source of truth.
+    """
+    def __init__(self, *args, **kwargs):
+        super(BitVersiBoard, self).__init__(*args, **kwargs)
+        self.bits  = BitBoard(self.width, self.height)
+        self.dirty = True
+        self.masks = {}
+
+    def __setitem__(self, tile_loc, item):
+        super(BitVersiBoard, self).__setitem__(tile_loc, item)
+        self.dirty = True
+
+    def player_masks(self, player):
+        if self.dirty:
+            masks = self.masks = {}
+            for i, loc in enumerate(self.geometry.locs):
+                tile = self[loc]
+                if not tile.blank:
+                    masks[tile.char] = masks.get(tile.char, 0) | 1 << i
+            self.dirty = False
+        return self.masks.get(player.char, 0), self.masks.get(player.enemy().char, 0)
+
+    def get_valid_moves(self, player):
+        own, opp = self.player_masks(player)
+        return self.bits.locs(self.bits.moves(own, opp))
+
+    def valid_move(self, player, loc):
+        own, opp = self.player_masks(player)
+        return bool(self.bits.captured(own, opp, self.bits.bit(loc)))
+
+    def get_captured(self, player, start_loc):
+        own, opp = self.player_masks(player)
+        captured = self.bits.captured(own, opp, self.bits.bit(start_loc))
+        return [self[loc] for loc in self.bits.locs(captured)]
+
+    def score(self, player):
+        return self.bits.count(self.player_masks(player)[0])
+
 
 class Player(PlayerBase):
+    search = None
+
     def __init__(self, char):
         self.char = char
         self.ai   = char in ai_players
 
     def __repr__(self) : return self.char
 
-    def score(self)    : return sum(tile==self for tile in board)
+    def score(self)    : return board.score(self)
     def enemy(self)    : return nextval(players, self)
 
     def make_move(self, loc):
@@ -105,6 +161,22 @@ class Player(PlayerBase):
         shuffle(moves)
         return first(sorted(moves, key=by_corner_score))
 
+    def get_ai_move(self):
+        if board.headless and board.num_pieces() - 4 < headless_openings:
+            return rndchoice(board.get_valid_moves(self))
+        return self.get_search_move() if (ai_search and bitboard) else self.get_random_move()
+
+    def get_search_move(self):
+        """ Return location of best move found by alpha-beta search within `search_time` seconds
+            (`headless_search` limits in headless games, independent of `pause_time`).
+        """
+        if not self.search:
+            if board.headless : self.search = AlphaBeta(board.bits, *headless_search)
+            else              : self.search = AlphaBeta(board.bits, search_time)
+        own, opp = board.player_masks(self)
+        move     = first(self.search.best_move(own, opp, players.index(self)))
+        return first(board.bits.locs(move))
+
 
 class Versi(object):
     winmsg     = "%s wins!"
@@ -119,10 +191,11 @@ class Versi(object):
 
     def game_end(self):
         board.draw()
-        winner = cmp(player1.score(), player2.score())
-        if not winner : print(nl, self.tiemsg)
-        else          : print(nl, self.winmsg % (player1 if winner>0 else player2))
-        sys.exit()
+        scores = player1.score(), player2.score()
+        winner = cmp(*scores)
+        winner = None if not winner else (player1 if winner>0 else player2)
+        msg    = self.winmsg % winner if winner else self.tiemsg
+        board.game_over(msg, winner=winner and winner.char, scores=scores)
 
 class BasicInterface(object):
     def run(self):
@@ -133,7 +206,7 @@ class BasicInterface(object):
 
         while True:
             board.draw()
-            move = player.get_random_move() if player.ai else self.get_move(player)
+            move = player.get_ai_move() if player.ai else self.get_move(player)
             player.make_move(move)
 
             # give next turn to enemy OR end game if no turns left, FALLTHRU: current player keeps the turn
@@ -147,11 +220,25 @@ class BasicInterface(object):
             else                             : print(self.textinput.invalid_move)
 
 
-if __name__ == "__main__":
-    board            = VersiBoard(size, Blank, num_grid=True, padding=padding, pause_time=pause_time)
+def new_game(**kwargs):
+    global board, players, player1, player2, versi
+    board_class      = BitVersiBoard if bitboard else VersiBoard
+    board            = board_class(size, Blank, index=("blank",), num_grid=True, padding=padding,
+                                   pause_time=pause_time, **kwargs)
     players          = [Player(c) for c in player_chars]
     player1, player2 = players
     versi            = Versi()
 
+def run_headless():
+    """Play one game between AI players without drawing; return the result (see `board.GameOver`)."""
+    global ai_players
+    ai_players = player_chars
+    new_game(headless=True)
+    try                  : BasicInterface().run()
+    except GameOver as e : return e.result
+
+
+if __name__ == "__main__":
+    new_game()
     try: BasicInterface().run()
     except KeyboardInterrupt: sys.exit()
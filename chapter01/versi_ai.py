@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- encoding: utf-8 -*-
+
+""" Alpha-beta search AI for Versi, working on `bitboard.BitBoard` masks.
+
+    Moves are made and taken back by passing masks down the recursion (a position is just two ints),
+    so the board is never copied. Positions are hashed with Zobrist keys, updated incrementally for
+    each placed and flipped piece, and cached in a fixed-size transposition table. Iterative
+    deepening keeps the best move of the last completed depth when the time budget runs out.
+"""
+
+from random import getrandbits, shuffle
+from time import time
+
+from utils import lastind
+
+EXACT, LOWER, UPPER = range(3)
+win_score           = 10000
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class TranspositionTable(object):
+    """ Fixed-size table of search results indexed by Zobrist hash, with depth-preferred replacement:
+        within one search (generation), a slot is overwritten only by a result searched at least as deep,
+        whether for the same or a colliding position; entries from older searches are always replaced.
+    """
+    def __init__(self, size=2**16):
+        self.size       = size
+        self.entries    = [None] * size
+        self.generation = 0
+
+    def get(self, key):
+        entry = self.entries[key % self.size]
+        if entry and entry[0] == key:
+            return entry
+
+    def put(self, key, depth, value, flag, move):
+        i     = key % self.size
+        entry = self.entries[i]
+        if not entry or entry[5] != self.generation or depth >= entry[1]:
+            self.entries[i] = (key, depth, value, flag, move, self.generation)
+
+
+class AlphaBeta(object):
+    """ Iterative deepening negamax with alpha-beta pruning.
+
+        `color` is 0 or 1, used to pick Zobrist keys for each player's pieces; `time_budget` is the
+        number of seconds allowed per move.
+    """
+    check_nodes = 255       # check time every N+1 nodes
+
+    def __init__(self, bits, time_budget=0.3, max_depth=20, table_size=2**16):
+        self.bits        = bits
+        self.time_budget = time_budget
+        self.max_depth   = max_depth
+        self.table       = TranspositionTable(table_size)
+        self.size        = bits.width * bits.height
+        self.keys        = [[getrandbits(64) for _ in range(self.size)] for _ in range(2)]
+        self.side_key    = getrandbits(64)
+        self.weights     = self.make_weights()
+        self.nodes       = 0
+        self.deadline    = None
+
+    def make_weights(self):
+        """Return list of (weight, mask) tuples: corners are good, squares next to corners are bad."""
+        bits         = self.bits
+        w, h         = bits.width, bits.height
+        lx, ly       = lastind(w), lastind(h)
+        weights      = {}
+
+        for y in range(h):
+            for x in range(w):
+                dx, dy = min(x, lx - x), min(y, ly - y)
+                if   dx == 0 and dy == 0 : weight = 25
+                elif dx <= 1 and dy <= 1 : weight = -8
+                elif dx == 0 or dy == 0  : weight = 3
+                else                     : weight = 1
+                weights[weight] = weights.get(weight, 0) | 1 << (y*w + x)
+        return sorted(weights.items())
+
+    def hash(self, own, opp, color):
+        keys = self.keys
+        key  = 0
+        for i in self.bits.bits(own) : key ^= keys[color][i]
+        for i in self.bits.bits(opp) : key ^= keys[1-color][i]
+        return key ^ (self.side_key if color else 0)
+
+    def evaluate(self, own, opp):
+        count = self.bits.count
+        score = sum( weight * (count(own & mask) - count(opp & mask)) for weight, mask in self.weights )
+        moves = self.bits.moves
+        return score + 2 * (count(moves(own, opp)) - count(moves(opp, own)))
+
+    def final(self, own, opp):
+        diff = self.bits.count(own) - self.bits.count(opp)
+        return win_score + diff if diff > 0 else (-win_score + diff if diff < 0 else 0)
+
+    def ordered(self, own, opp, moves, best):
+        """ Order `moves` mask as a list of move bits: previous best move first, then by square weight;
+            squares of equal weight are shuffled, so that equally good moves are picked at random.
+        """
+        order = [best] if best and best & moves else []
+        for _, mask in reversed(self.weights):
+            m     = moves & mask & ~(best or 0)
+            group = []
+            while m:
+                low = m & -m
+                group.append(low)
+                m  ^= low
+            shuffle(group)
+            order.extend(group)
+        return order
+
+    def negamax(self, own, opp, key, color, depth, alpha, beta):
+        self.nodes += 1
+        if not self.nodes & self.check_nodes and time() > self.deadline:
+            raise SearchTimeout
+
+        orig_alpha = alpha
+        best       = None
+        entry      = self.table.get(key)
+        if entry:
+            _, edepth, value, flag, best, _ = entry
+            if edepth >= depth:
+                if flag == EXACT   : return value
+                elif flag == LOWER : alpha = max(alpha, value)
+                elif flag == UPPER : beta = min(beta, value)
+                if alpha >= beta   : return value
+
+        bits  = self.bits
+        moves = bits.moves(own, opp)
+        if not moves:
+            if not bits.moves(opp, own):
+                return self.final(own, opp)
+            if depth == 0:
+                return self.evaluate(own, opp)
+            # pass: other player moves again
+            return -self.negamax(opp, own, key ^ self.side_key, 1-color, depth-1, -beta, -alpha)
+
+        if depth == 0:
+            return self.evaluate(own, opp)
+
+        keys, okeys = self.keys[color], self.keys[1-color]
+        best_value  = -win_score * 2
+        best_move   = None
+
+        for move in self.ordered(own, opp, moves, best):
+            captured = bits.captured(own, opp, move)
+            nkey     = key ^ self.side_key ^ keys[move.bit_length() - 1]
+            for i in bits.bits(captured):
+                nkey ^= keys[i] ^ okeys[i]
+
+            value = -self.negamax(opp & ~captured, own | move | captured, nkey, 1-color, depth-1, -beta, -alpha)
+            if value > best_value:
+                best_value, best_move = value, move
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        if best_value <= orig_alpha : flag = UPPER
+        elif best_value >= beta     : flag = LOWER
+        else                        : flag = EXACT
+        self.table.put(key, depth, best_value, flag, best_move)
+        return best_value
+
+    def best_move(self, own, opp, color):
+        """Return (move bit, search depth, value) of the best move for `own` player, or None if no moves."""
+        moves = self.bits.moves(own, opp)
+        if not moves:
+            return None
+
+        self.table.generation += 1
+        self.nodes    = 0
+        self.deadline = time() + self.time_budget
+        key           = self.hash(own, opp, color)
+        result        = (self.ordered(own, opp, moves, None)[0], 0, None)
+
+        for depth in range(1, self.max_depth + 1):
+            try:
+                value = self.negamax(own, opp, key, color, depth, -win_score * 2, win_score * 2)
+            except SearchTimeout:
+                break
+            entry = self.table.get(key)
+            if entry and entry[4]:
+                result = entry[4], depth, value
+            if abs(value) >= win_score - self.size:
+                break       # game result is known
+        return result
@@ -1,50 +1,117 @@
 #!/usr/bin/env python
 
 # Imports {{{
+from __future__ import print_function
 import sys
+from array import array
 from random import randint
-from copy import deepcopy
 
 from shared import *
 
 dimensions = 90, 30
 wall       = u'\u25af'
+blank      = (' ',)     # value of a blank cell, not to be changed in place
 # }}}
 
 
 class Field(object):
+    """ Cells are kept in a flat list indexed by y*maxx + x, each a list of items on top of ' '. A cell is
+        blank unless its stamp matches the current generation, so `clear()` only starts a new generation.
+        `snapshot()` starts recording cells before their first change, `rollback()` restores them.
+    """
     def __init__(self):
         self.maxx, self.maxy = dimensions
-        self.blank = [ [[' '] for _ in range(self.maxx)] for _ in range(self.maxy) ]
+        self.size      = self.maxx * self.maxy
+        self.cells     = [None] * self.size
+        self.stamp     = array('L', [0] * self.size)
+        self.gen       = 0
+        self.last_gen  = 0
+        self.used      = 0     # number of non-blank cells
+        self.snapshots = []    # (generation, used, {index: (stamp, cell)})
         self.clear()
         # for loc in self: Thing(self, wall, loc, False)
         for loc in self: self.put(wall, loc)
 
+    def index(self, x, y=None):
+        x, y = unwrap(x, y)
+        return y*self.maxx + x
+
     def is_empty(self):
-        return self.field == self.blank
+        return not self.used
+
+    def cell(self, i, write=False):
+        """Cell at index `i`; if `write`, it's first saved to the current snapshot."""
+        current = self.stamp[i] == self.gen
+        if write:
+            if self.snapshots:
+                saved = self.snapshots[-1][2]
+                if i not in saved:
+                    saved[i] = self.stamp[i], self.cells[i] and self.cells[i][:]
+            if not current:
+                self.cells[i], self.stamp[i] = [' '], self.gen
+        elif not current:
+            return blank
+        return self.cells[i]
 
     def clear(self, loc=None):
-        if loc: self.field[loc.y][loc.x] = [' ']
-        else:   self.field = deepcopy(self.blank)
+        if loc:
+            c = self.cell(self.index(loc), True)
+            if len(c) > 1: self.used -= 1
+            c[:] = [' ']
+        else:
+            self.last_gen += 1
+            self.gen       = self.last_gen
+            self.used      = 0
+
+    def snapshot(self):
+        """Start recording changes; return snapshot number for `rollback()` / `commit()`."""
+        self.snapshots.append( (self.gen, self.used, {}) )
+        return len(self.snapshots) - 1
+
+    def rollback(self, snap=None):
+        """Restore the field to the state at `snap` (default: last snapshot) and drop it."""
+        snap = len(self.snapshots)-1 if snap is None else snap
+        while len(self.snapshots) > snap:
+            self.gen, self.used, saved = self.snapshots.pop()
+            for i, (stamp, cell) in saved.items():
+                self.stamp[i], self.cells[i] = stamp, cell
+
+    def commit(self, snap=None):
+        """Keep changes since `snap` (default: last snapshot); they are still undone by rollback of an earlier one."""
+        snap = len(self.snapshots)-1 if snap is None else snap
+        while len(self.snapshots) > snap:
+            saved = self.snapshots.pop()[2]
+            if self.snapshots:
+                parent = self.snapshots[-1][2]
+                for i, v in saved.items():
+                    parent.setdefault(i, v)
+
+    @property
+    def field(self):
+        """Rows of cells."""
+        cells = [self.cell(i) for i in range(self.size)]
+        return [cells[y*self.maxx : (y+1)*self.maxx] for y in range(self.maxy)]
 
     def display(self):
         topleft, topright, bottomleft, bottomright, horizontal, vertical = u"\u250c \u2510 \u2514 \u2518 \u2500 \u2502".split()
 
         # print '\n'*45
-        print ' ' + topleft + horizontal*self.maxx + topright
+        print(' ' + topleft + horizontal*self.maxx + topright)
         for n, row in enumerate(self.field):
-            print ' ' + vertical + joinst(row, '') + vertical,
-            if n%8 == 0: print '-'
-            else: print
-        print ' ' + bottomleft + horizontal*self.maxx + bottomright
-        print ' ',
+            print(' ' + vertical + joinst(row, '') + vertical, end=' ')
+            if n%8 == 0: print('-')
+            else: print()
+        print(' ' + bottomleft + horizontal*self.maxx + bottomright)
+        print(' ', end=' ')
         for x in range(8):
             sys.stdout.write(' '*9 + '|')
-        print
+        print()
 
     def put(self, thing, loc=None):
         if not loc: loc = thing.loc
-        self.field[loc.y][loc.x].append(thing)
+        c = self.cell(self.index(loc), True)
+        if len(c) == 1: self.used += 1
+        c.append(thing)
 
     def __iter__(self):
         for y in range(self.maxy):
@@ -72,31 +139,34 @@ class Field(object):
             self.put(item)
             return loc2
 
-    def valid(self, loc):
+    def valid(self, x, y=None):
         x, y = unwrap(x, y)
-        if x+1 <= self.maxx and y+1 <= self.maxy and x >= 0 and y >= 0:
-            return True
+        return 0 <= x < self.maxx and 0 <= y < self.maxy
 
-    def near_border(self, loc):
+    def near_border(self, x, y=None):
         x, y = unwrap(x, y)
         if x+1 == self.maxx or y+1 == self.maxy or x == 0 and y == 0:
             return True
 
     def empty(self, loc):
-        if self.valid(loc) and self.values(loc) == [' ']:
+        if self.valid(loc) and len(self.values(loc)) == 1:
             return True
 
     def remove(self, item, loc=None):
         loc = loc or item.loc
-        l = self.field[loc.y][loc.x]
-        if item in l: l.remove(item)
+        i   = self.index(loc)
+        if item in self.cell(i):
+            c = self.cell(i, True)
+            c.remove(item)
+            if len(c) == 1: self.used -= 1
 
     def value(self, x, y=None):
         return self.values(x, y)[-1]
 
-    def values(self, loc):
+    def values(self, x, y=None):
         x, y = unwrap(x, y)
-        if self.valid(x, y): return self.field[y][x]
+        if 0 <= x < self.maxx and 0 <= y < self.maxy:
+            return self.cell(y*self.maxx + x)
 
     def random(self):
         return randint(0, self.maxx-1), randint(0, self.maxy-1)
@@ -10,8 +10,13 @@
 # Your Own Computer Games with Python", chapter 15:
 #   http://inventwithpython.com/chapter15.html
 
-import random, sys, pygame, time, copy
-from pygame.locals import *
+import random, sys, time, copy
+
+try:
+    import pygame
+    from pygame.locals import *
+except ImportError:
+    pygame = None   # game logic, AI and benchmark still work
 
 FPS            = 10
 WINDOWWIDTH    = 640
@@ -24,6 +29,8 @@ black_tile     = "black_tile"
 EMPTY_SPACE    = "EMPTY_SPACE"
 HINT_TILE      = "HINT_TILE"
 ANIMATIONSPEED = 25 # integer from 1 to 100, higher is faster animation
+AI_DEPTH       = 1  # plies searched by the computer; 1 picks the move that flips most tiles
+INFINITY       = float('inf')  # initial search window bound; finished games score up to 64x100
 
 XMARGIN        = int((WINDOWWIDTH - (BOARDWIDTH * SPACESIZE)) / 2)
 YMARGIN        = int((WINDOWHEIGHT - (BOARDHEIGHT * SPACESIZE)) / 2)
@@ -39,6 +46,8 @@ TEXTBGCOLOR2   = GREEN
 GRIDLINECOLOR  = BLACK
 TEXTCOLOR      = WHITE
 HINTCOLOR      = BROWN
+
+DIRECTIONS     = [[0, 1], [1, 1], [1, 0], [1, -1], [0, -1], [-1, -1], [-1, 0], [-1, 1]]
 # }}}
 
 
@@ -67,10 +76,10 @@ def main():
     while True:
         if not run_game(): break
 
-def render_text(text, colour, bg=None, topright=None, center=None, bottomleft=None, font=FONT):
+def render_text(text, colour, bg=None, topright=None, center=None, bottomleft=None, font=None):
     args = [text, True, colour]
     if bg: args.append(bg)
-    surf = font.render(*args)
+    surf = (font or FONT).render(*args)
     rect = surf.get_rect()
     if topright     : rect.topright = topright
     elif center     : rect.center = center
@@ -276,47 +285,37 @@ def get_new_board():
         board.append([EMPTY_SPACE] * BOARDHEIGHT)
     return board
 
+def get_rays(xstart, ystart):
+    """Lists of spaces from xstart, ystart to the edge of the board in each direction, if at least 2 long."""
+    rays = []
+    for xdirection, ydirection in DIRECTIONS:
+        x, y = xstart + xdirection, ystart + ydirection
+        ray = []
+        while is_on_board(x, y):
+            ray.append((x, y))
+            x, y = x + xdirection, y + ydirection
+        if len(ray) > 1:
+            rays.append(ray)
+    return rays
+
 def is_valid_move(board, tile, xstart, ystart):
     """If it is a valid move, returns a list of spaces of the captured pieces."""
-    if board[xstart][ystart] != EMPTY_SPACE or not is_on_board(xstart, ystart):
+    if not is_on_board(xstart, ystart) or board[xstart][ystart] != EMPTY_SPACE:
         return False
 
-    board[xstart][ystart] = tile    # temporarily set the tile on the board.
     other_tile = black_tile if tile==white_tile else white_tile
-
     tiles_to_flip = []
-    # check each of the eight directions:
-    for xdirection, ydirection in [[0, 1], [1, 1], [1, 0], [1, -1], [0, -1], [-1, -1], [-1, 0], [-1, 1]]:
-        x, y = xstart, ystart
-        x += xdirection
-        y += ydirection
-        if is_on_board(x, y) and board[x][y] == other_tile:
-            # The piece belongs to the other player next to our piece.
-            x += xdirection
-            y += ydirection
-            if not is_on_board(x, y):
-                continue
-
-            while board[x][y] == other_tile:
-                x += xdirection
-                y += ydirection
-                if not is_on_board(x, y):
-                    break
-            if not is_on_board(x, y):
-                continue
-
-            if board[x][y] == tile:
-                # There are pieces to flip over. Go in the reverse
-                # direction until we reach the original space, noting all
-                # the tiles along the way.
-                while True:
-                    x -= xdirection
-                    y -= ydirection
-                    if x == xstart and y == ystart:
-                        break
-                    tiles_to_flip.append([x, y])
+    for ray in RAYS[xstart][ystart]:
+        x, y = ray[0]
+        if board[x][y] != other_tile:
+            continue
+        # The piece belongs to the other player next to our piece: flip the line if it ends with our piece.
+        for n, (x, y) in enumerate(ray):
+            if board[x][y] != other_tile:
+                if board[x][y] == tile:
+                    tiles_to_flip.extend(ray[:n])
+                break
 
-    board[xstart][ystart] = EMPTY_SPACE
     return tiles_to_flip or False
 
 def is_on_board(x, y):
@@ -331,7 +330,8 @@ def get_board_with_valid_moves(board, tile):
     return dupe_board
 
 def get_valid_moves(board, tile):
-    return [(x,y) for x in range(BOARDWIDTH) for y in range(BOARDHEIGHT) if is_valid_move(board, tile, x, y)]
+    return [(x,y) for x in range(BOARDWIDTH) for y in range(BOARDHEIGHT)
+            if board[x][y] == EMPTY_SPACE and is_valid_move(board, tile, x, y)]
 
 def get_score_of_board(board):
     """Determine the score by counting the tiles."""
@@ -374,9 +374,10 @@ def enter_player_tile():
         pygame.display.update()
         MAINCLOCK.tick(FPS)
 
-def make_move(board, tile, xstart, ystart, real_move=False):
+def make_move(board, tile, xstart, ystart, real_move=False, scores=None):
     """ Place the tile on the board at xstart, ystart, and flip tiles
-        Returns False if this is an invalid move, True if it is valid.
+        Returns False if this is an invalid move, else the list of flipped tiles for `unmake_move()`.
+        If `scores` is given (see get_score_of_board()), it's updated with the tiles placed and flipped.
     """
     tiles_to_flip = is_valid_move(board, tile, xstart, ystart)
     if tiles_to_flip:
@@ -386,15 +387,31 @@ def make_move(board, tile, xstart, ystart, real_move=False):
 
         for x, y in tiles_to_flip:
             board[x][y] = tile
-        return True
+        if scores is not None:
+            scores[tile] += len(tiles_to_flip) + 1
+            scores[get_other_tile(tile)] -= len(tiles_to_flip)
+    return tiles_to_flip
+
+def unmake_move(board, tile, xstart, ystart, flipped, scores=None):
+    """Take back the move made by make_move(), which returned `flipped` tiles."""
+    other_tile = get_other_tile(tile)
+    board[xstart][ystart] = EMPTY_SPACE
+    for x, y in flipped:
+        board[x][y] = other_tile
+    if scores is not None:
+        scores[tile] -= len(flipped) + 1
+        scores[other_tile] += len(flipped)
+
+def get_other_tile(tile):
+    return black_tile if tile==white_tile else white_tile
 
 def is_on_corner(x, y):
     # Returns True if the position is in one of the four corners.
     return (x == 0 and y == 0) or  (x == BOARDWIDTH and y == 0) or \
            (x == 0 and y == BOARDHEIGHT) or (x == BOARDWIDTH and y == BOARDHEIGHT)
 
-def get_computer_move(board, computer_tile):
-    """Performace issue: adding undo method to board would be faster than deepcopy."""
+def get_computer_move(board, computer_tile, depth=None):
+    """Moves are tried on the board and taken back, the board is left as it was."""
     possible_moves = get_valid_moves(board, computer_tile)
     random.shuffle(possible_moves)
 
@@ -403,16 +420,86 @@ def get_computer_move(board, computer_tile):
         if is_on_corner(*loc): return loc
 
     # Go through all possible moves and remember the best scoring move
-    best_score = -1
+    depth      = depth or AI_DEPTH
+    other_tile = get_other_tile(computer_tile)
+    scores     = get_score_of_board(board)
+    best_score = None
     for loc in possible_moves:
-        dupe_board = copy.deepcopy(board)
-        make_move(dupe_board, computer_tile, *loc)
-        score = get_score_of_board(dupe_board)[computer_tile]
-        if score > best_score:
+        flipped = make_move(board, computer_tile, *loc, scores=scores)
+        score   = -minimax(board, other_tile, depth-1, scores)
+        unmake_move(board, computer_tile, loc[0], loc[1], flipped, scores)
+        if best_score is None or score > best_score:
             best_move = loc
             best_score = score
     return best_move
 
+def minimax(board, tile, depth, scores, alpha=-INFINITY, beta=INFINITY):
+    """ Value of the board for `tile` to move: tile count difference after `depth` moves, with the best
+        replies (negamax with alpha-beta pruning); a finished game counts x100.
+    """
+    other_tile = get_other_tile(tile)
+    if depth <= 0:
+        return scores[tile] - scores[other_tile]
+
+    moves = get_valid_moves(board, tile)
+    if not moves:
+        if not get_valid_moves(board, other_tile):
+            return (scores[tile] - scores[other_tile]) * 100
+        return -minimax(board, other_tile, depth-1, scores, -beta, -alpha)
+
+    for x, y in moves:
+        flipped = make_move(board, tile, x, y, scores=scores)
+        value   = -minimax(board, other_tile, depth-1, scores, -beta, -alpha)
+        unmake_move(board, tile, x, y, flipped, scores)
+        if value > alpha:
+            alpha = value
+            if alpha >= beta:
+                break
+    return alpha
+
+def benchmark(positions=200, depth=3):
+    """Evaluate all moves in random positions with deepcopy and with make/unmake; print moves per second."""
+    boards, tile = [], white_tile
+    while len(boards) < positions:
+        board = get_new_board()
+        reset_board(board)
+        for _ in range(random.randint(0, 50)):
+            moves = get_valid_moves(board, tile) or get_valid_moves(board, get_other_tile(tile))
+            if not moves: break
+            if not get_valid_moves(board, tile): tile = get_other_tile(tile)
+            make_move(board, tile, *random.choice(moves))
+            tile = get_other_tile(tile)
+        if get_valid_moves(board, tile):
+            boards.append((board, tile))
+
+    start, n = time.time(), 0
+    for board, tile in boards:
+        for loc in get_valid_moves(board, tile):
+            dupe_board = copy.deepcopy(board)
+            make_move(dupe_board, tile, *loc)
+            get_score_of_board(dupe_board)[tile]
+            n += 1
+    copy_rate = n / (time.time() - start)
+
+    start = time.time()
+    for board, tile in boards:
+        scores = get_score_of_board(board)
+        for loc in get_valid_moves(board, tile):
+            flipped = make_move(board, tile, *loc, scores=scores)
+            scores[tile]
+            unmake_move(board, tile, loc[0], loc[1], flipped, scores)
+    undo_rate = n / (time.time() - start)
+
+    start = time.time()
+    for board, tile in boards[:20]:
+        get_computer_move(board, tile, depth)
+    search_time = (time.time() - start) / min(20, len(boards))
+
+    print("%d moves in %d positions" % (n, len(boards)))
+    print("deepcopy:    %8.0f moves/s" % copy_rate)
+    print("make/unmake: %8.0f moves/s (%.1fx)" % (undo_rate, undo_rate / copy_rate))
+    print("depth %d search: %.1fms per move" % (depth, search_time * 1000))
+
 def key_up(event, key):
     return event.key==key and event.type==KEYUP
 
@@ -423,5 +510,10 @@ def check_for_quit():
             sys.exit()
 
 
+RAYS = [[get_rays(x, y) for y in range(BOARDHEIGHT)] for x in range(BOARDWIDTH)]
+
 if __name__ == "__main__":
-    main()
+    if sys.argv[1:2] == ["bench"]:
+        benchmark(*[int(a) for a in sys.argv[2:4]])
+    else:
+        main()
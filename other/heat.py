@@ -3,17 +3,130 @@ file: heat.py
 
 Based on steady-state.py.
 
-This defines not only the steady state model but also the PyGame code necessary to
-visualize it using Surfarray.
+This defines the steady state model of heat diffusion in a square plate, three sides held at 100.0
+degrees and one at 0, and the PyGame code necessary to visualize it using Surfarray.
+
+`HeatField` updates the grid with vectorized NumPy slicing, using one of two methods:
+
+    jacobi   - each new value is the mean of the 4 neighbours from the previous step; two grids are
+               used as front and back buffer, swapped after each step
+    redblack - Gauss-Seidel on a checkerboard: 'red' cells are updated in place from 'black' ones,
+               then 'black' from the new 'red' ones; converges in fewer iterations
+
+All buffers are allocated up front, so a step does no allocation. PyGame is optional: without it,
+or with headless=1, the model is iterated until it converges (or for `max_iterations`) and the speed
+is reported.
+
+usage: heat.py [N] [method=jacobi|redblack] [epsilon=0.01] [max_iterations=K] [headless=1]
 """
 import sys
-import math
 import time
-import Numeric
 
-import pygame
-from pygame.locals import *
-from pygame import surfarray
+import numpy
+
+try:
+    import pygame
+    from pygame.locals import QUIT, KEYDOWN, K_ESCAPE, K_f
+    from pygame import surfarray
+except ImportError:
+    pygame = None
+
+methods = ("jacobi", "redblack")
+hot     = 100.0
+cold    = 0.0
+
+
+class HeatField(object):
+    """N x N grid `u` of temperatures; `step()` does one iteration and returns the largest change."""
+
+    def __init__(self, N=100, method="jacobi", dtype=numpy.float32):
+        if method not in methods:
+            raise ValueError("method must be one of %s" % (methods,))
+        self.N      = N
+        self.method = method
+        self.u      = self.initial(N, dtype)
+        self.pixels = numpy.zeros((N, N), numpy.int32)
+        self.scaled = numpy.zeros((N, N), dtype)
+        self.scale  = 255.0 / hot      # full range of the 256 color palette for any N (was 255/N, the same at N=100)
+
+        inner = (N-2, N-2)
+        if method == "jacobi":
+            self.w     = self.u.copy()
+            self.delta = numpy.zeros(inner, dtype)
+        else:
+            # the four sub-lattices of interior cells: (first row, first column), step 2 both ways
+            self.lattices = [ ((1, 1), (2, 2)), ((1, 2), (2, 1)) ]     # red, black
+            shapes        = dict( (start, self.sub(self.u, *start).shape) for color in self.lattices for start in color )
+            self.temp     = dict( (start, numpy.zeros(shape, dtype)) for start, shape in shapes.items() )
+            self.diff     = dict( (start, numpy.zeros(shape, dtype)) for start, shape in shapes.items() )
+
+    def initial(self, N, dtype):
+        u         = numpy.zeros((N, N), dtype)
+        u[:, 0]   = hot
+        u[:, N-1] = hot
+        u[0, :]   = hot
+        u[N-1, :] = cold
+
+        edges       = numpy.concatenate( (u[0, :], u[N-1, :], u[1:-1, 0], u[1:-1, N-1]) )
+        u[1:-1, 1:-1] = edges.mean()    # initial guess for the interior
+        return u
+
+    def sub(self, u, row, col, drow=0, dcol=0):
+        """View of the sub-lattice of interior cells starting at `row`, `col`, shifted by `drow`, `dcol`."""
+        N = self.N
+        return u[row+drow : N-1+drow : 2, col+dcol : N-1+dcol : 2]
+
+    def step(self):
+        if self.method == "jacobi" : return self.jacobi()
+        else                       : return self.redblack()
+
+    def jacobi(self):
+        u, w, d = self.u, self.w, self.delta
+        wi      = w[1:-1, 1:-1]
+        numpy.add(u[:-2, 1:-1], u[2:, 1:-1], out=wi)
+        wi += u[1:-1, :-2]
+        wi += u[1:-1, 2:]
+        wi *= 0.25
+
+        numpy.subtract(wi, u[1:-1, 1:-1], out=d)
+        numpy.abs(d, out=d)
+        self.u, self.w = w, u
+        return float(d.max())
+
+    def redblack(self):
+        u, sub, delta = self.u, self.sub, 0.0
+        for color in self.lattices:
+            for start in color:
+                t, d = self.temp[start], self.diff[start]
+                numpy.add(sub(u, *start, drow=-1), sub(u, *start, drow=1), out=t)
+                t += sub(u, *start, dcol=-1)
+                t += sub(u, *start, dcol=1)
+                t *= 0.25
+
+                cells = sub(u, *start)
+                numpy.subtract(t, cells, out=d)
+                numpy.abs(d, out=d)
+                cells[...] = t
+                if d.size:
+                    delta = max(delta, float(d.max()))
+        return delta
+
+    def solve(self, epsilon=0.01, max_iterations=None):
+        """Iterate until the largest change is at most `epsilon`; return number of iterations and last change."""
+        iterations, delta = 0, None
+        while max_iterations is None or iterations < max_iterations:
+            iterations += 1
+            delta       = self.step()
+            if delta <= epsilon:
+                break
+        return iterations, delta
+
+    def update_pixels(self):
+        """Update `pixels` palette indexes from temperatures."""
+        numpy.multiply(self.u, self.scale, out=self.scaled)
+        self.pixels[...] = self.scaled
+        return self.pixels
+
 
 def drawfield( screen, scale_surface, pixels ):
     surfarray.blit_array( scale_surface, pixels )
@@ -24,52 +137,28 @@ def drawfield( screen, scale_surface, pixels ):
 def createPalette( ):
     r,g,b = -1,0,256
     palette = []
-    for i in xrange(0,256):
+    for i in range(0,256):
         r += 1
         b -= 1
         palette.append( (r,g,b) )
-    return palette    
-
-def main( N=100, EPSILON = 0.01 ):
-    # Stores Old(previous timestep) Values 
-    u = Numeric.zeros( (N,N),Numeric.Float32 )
-    # New(current/next timestep) Values
-    w = Numeric.zeros( (N,N),Numeric.Float32 )
-    pixels = Numeric.zeros( (N,N), Numeric.Int32 )
-    # Set boundary values and compute mean boundary value
-    mean = 0.0
-    # This "magic" factor is just a scaling to get the full range of our (255.0/N)
-    # color palette.
-    for i in xrange(N):
-        # 3 sides @ 100.0 degrees
-        u[i][0] = 100.0
-        pixels[i][0] = int(100 * (255.0/N))
-        u[i][N-1] = 100.0
-        pixels[i][N-1] = int(100 * (255.0/N))
-        u[0][i]  = 100.0
-        pixels[0][i] = int(100 * (255.0/N))
-        # 1 side @ 0 degrees
-    for i in xrange(N):
-        u[N-1][i] = 0.0
-        pixels[N-1][i] = 0.0
-        
-    mean += Numeric.sum(u[:][0])
-    mean += Numeric.sum(u[:][N-1])
-    mean += Numeric.sum(u[0][:])
-    mean += Numeric.sum(u[N-1][:])
-    mean /= (4.0 * N)
-
-    # Initialize interior values:
-    print mean
-    for i in xrange(1,N-1):
-        for j in xrange(1,N-1):
-            u[i][j] = mean
-            pixels[i][j] = int(mean * (255.0/N))
-    
+    return palette
+
+def headless( N=100, EPSILON=0.01, method="jacobi", max_iterations=None ):
+    field = HeatField(N, method)
+    start = time.time()
+    iterations, delta = field.solve(EPSILON, max_iterations)
+    sec   = time.time() - start
+    state = "converged" if delta <= EPSILON else "stopped"
+    print("%s: N=%d %s after %d iterations (last change %.4f) in %.2fs, %.1f iterations/s, %.1fM cells/s" %
+          (method, N, state, iterations, delta, sec, iterations / sec, iterations * (N-2)**2 / sec / 1e6))
+    return iterations
+
+def main( N=100, EPSILON = 0.01, method="jacobi" ):
+    field = HeatField(N, method)
 
     WINSIZE = 640,480
     ARRAYSIZE = N,N
-    
+
     # Initialize the Pygame Engine!
     pygame.init()
     screen = pygame.display.set_mode(WINSIZE,0,8)
@@ -81,29 +170,17 @@ def main( N=100, EPSILON = 0.01 ):
     scale_screen.fill(black)
     screen.set_palette( palette )
     scale_screen.set_palette( palette )
-    
+
     # Compute Steady-State solution:
     done = False # Is true when we reach steady state
     userquit = False # is true only when the user is done watching
     iterations = 0
+    pixels = field.update_pixels()
     while not userquit:
-        iterations += 1
-        delta = 0.0
         if not done:
-            for i in xrange(1,N-1):
-                for j in xrange(1,N-1):
-                    w[i][j] = u[i-1][j] + u[i+1][j] + u[i][j-1] + u[i][j+1]
-                    w[i][j] = w[i][j] / 4.0
-                    d = math.fabs( w[i][j] - u[i][j] ) 
-                    if( d > delta ):
-                        delta = d
-            if( delta <= EPSILON ):
-                done = True
-            # Copy new interior state to old:
-            for i in xrange(1,N-1):
-                for j in xrange(1,N-1):
-                    u[i][j] = w[i][j]
-                    pixels[i][j] = int(w[i][j] * (255.0/N)) 
+            iterations += 1
+            done   = field.step() <= EPSILON
+            pixels = field.update_pixels()
         # Draw
         drawfield( screen, scale_screen, pixels )
         pygame.display.update()
@@ -121,16 +198,22 @@ def main( N=100, EPSILON = 0.01 ):
                     pygame.display.toggle_fullscreen()
 
     # Print Solution:
-    print u
+    print(field.u)
     return iterations
-                    
+
 if __name__=="__main__":
-    print "Starting Steady State Example:"
-    if( len(sys.argv) >= 2 ):
-        N = int( sys.argv[1] )
+    args     = [a for a in sys.argv[1:] if '=' not in a]
+    settings = dict(a.split('=', 1) for a in sys.argv[1:] if '=' in a)
+    N        = int(args[0]) if args else 100
+    method   = settings.get("method", "jacobi")
+    epsilon  = float(settings.get("epsilon", 0.01))
+    maxiter  = int(settings["max_iterations"]) if "max_iterations" in settings else None
+
+    if pygame is None or settings.get("headless") == "1":
+        headless(N, epsilon, method, maxiter)
     else:
-        N = 100
-    start = time.time()
-    iterations = main(N)
-    end = time.time()
-    print "Finished Steady State Example in",end - start,"and",iterations,"iterations."
+        print("Starting Steady State Example:")
+        start = time.time()
+        iterations = main(N, epsilon, method)
+        end = time.time()
+        print("Finished Steady State Example in",end - start,"and",iterations,"iterations.")
@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+
+""" Headless game of life engines for the rulesets in rules.py.
+
+    ArrayLife  - whole field in a NumPy array; neighbour counts are summed from 8 shifted slices of a
+                 padded copy, and the fuzzy rules are applied as masks built from a seeded generator
+    SparseLife - set of int keys of live cells, counting neighbours of live cells only; for huge, mostly
+                 empty worlds, optionally unbounded
+
+    Both run the `life`, `lifernd` and `lifend` rules of `Rules`: in the fuzzy rules a cell is born
+    with 2, 4 or 5 neighbours instead of 3 at random (see `fuzzy_add`), and dies of over- or under-
+    population only by chance; `lifend` changes the rules every `night_period` generations.
+
+    usage: life.py [array|sparse] [rule] [generations] [width] [height]
+"""
+
+import sys
+from time import time
+from random import Random
+from collections import Counter
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+rules        = ("life", "lifernd", "lifend")
+fuzzy_add    = ((0.8, 2), (0.7, 5), (0.6, 4))    # (random number above, neighbours needed for birth)
+normal_add   = 3
+night_period = 15
+density      = 0.3
+offsets      = [(dx, dy) for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dx or dy]
+
+
+def rule_params(rule, n):
+    """ Return (fuzzy, survive_min, remove_above, add_shift) for `rule` in generation `n`: a live cell with
+        fewer than `survive_min` or more than 3 neighbours is removed if random number > `remove_above`
+        (None: always), a cell is born with the birth number of neighbours plus `add_shift`.
+    """
+    if rule == "life"    : return False, 2, None, 0
+    if rule == "lifernd" : return True, 2, 0.5, 0
+    if rule == "lifend":
+        if int(n / night_period) % 2:
+            return True, 3, 0.58, 1
+        return True, 2, 0.5, 0
+    raise ValueError("unknown rule: %s" % rule)
+
+def birth_number(rnd):
+    for above, add in fuzzy_add:
+        if rnd > above:
+            return add
+    return normal_add
+
+def fuzzy_ranges():
+    """ Return {neighbours: (low, high)}: in the fuzzy rules, a cell with this number of neighbours is born
+        if low < random number <= high; the same odds as `birth_number()`, without the function call.
+    """
+    ranges, high = {}, 1.0
+    for above, add in fuzzy_add:
+        ranges[add], high = (above, high), above
+    ranges[normal_add] = (-1.0, high)
+    return ranges
+
+
+class ArrayLife(object):
+    """ Field of `width` x `height` cells; `walls` is an optional boolean array of cells where nothing is
+        born; with `wrap`, the field wraps around at the edges.
+    """
+    def __init__(self, width, height, rule="life", seed=None, wrap=False, walls=None):
+        if numpy is None:
+            raise ImportError("ArrayLife requires numpy")
+        rule_params(rule, 0)
+        self.width, self.height = width, height
+        self.rule   = rule
+        self.wrap   = wrap
+        self.n      = 0
+        self.rng    = numpy.random.default_rng(seed)
+        self.cells  = numpy.zeros((height, width), numpy.bool_)
+        self.padded = numpy.zeros((height+2, width+2), numpy.uint8)
+        self.counts = numpy.zeros((height, width), numpy.uint8)
+        self.rnd    = numpy.zeros((height, width))
+        self.open   = ~walls if walls is not None else numpy.ones((height, width), numpy.bool_)
+
+    def randomize(self, density=density):
+        self.cells[...] = (self.rng.random(self.cells.shape) < density) & self.open
+
+    def neighbours(self):
+        """Fill and return the array of live neighbour counts."""
+        p, c, h, w = self.padded, self.counts, self.height, self.width
+        p[1:-1, 1:-1] = self.cells
+        if self.wrap:
+            p[0, 1:-1], p[-1, 1:-1] = p[h, 1:-1], p[1, 1:-1]
+            p[:, 0], p[:, -1]       = p[:, w], p[:, 1]
+
+        numpy.add(p[:-2, :-2], p[:-2, 1:-1], out=c)
+        for dy, dx in ((0, 2), (1, 0), (1, 2), (2, 0), (2, 1), (2, 2)):
+            c += p[dy : dy+h, dx : dx+w]
+        return c
+
+    def births(self, counts, fuzzy, shift):
+        if not fuzzy:
+            return counts == normal_add + shift
+
+        rnd = self.rng.random(out=self.rnd)
+        add = numpy.full(counts.shape, normal_add, numpy.uint8)
+        for above, num in reversed(fuzzy_add):
+            add[rnd > above] = num
+        return counts == add + shift
+
+    def step(self):
+        fuzzy, survive_min, remove_above, shift = rule_params(self.rule, self.n)
+        cells  = self.cells
+        counts = self.neighbours()
+        born   = self.births(counts, fuzzy, shift) & ~cells & self.open
+        dying  = cells & ((counts < survive_min) | (counts > 3))
+        if remove_above is not None:
+            dying &= self.rng.random(out=self.rnd) > remove_above
+
+        cells &= ~dying
+        cells |= born
+        self.n += 1
+
+    def run(self, generations):
+        for _ in range(generations):
+            self.step()
+
+    def population(self):
+        return int(self.cells.sum())
+
+    def __str__(self):
+        return '\n'.join(''.join('o' if c else ' ' for c in row) for row in self.cells)
+
+
+class SparseLife(object):
+    """ Set of live cells; `size` is (width, height), or None for an unbounded world; `walls` is an
+        optional set of (x, y) locations where nothing is born.
+
+        Cells are kept as int keys y*stride + x, with the stride wider than the world so that offsets to
+        neighbours don't wrap across rows; neighbours are counted by a `Counter` updated from 8 maps of
+        the live cell keys, one per neighbour offset, which runs at C speed.
+    """
+    def __init__(self, size=None, rule="life", seed=None, walls=None):
+        rule_params(rule, 0)
+        self.size    = size
+        self.rule    = rule
+        self.n       = 0
+        self.rng     = Random(seed)
+        self.stride  = size[0] + 2 if size else 2**32
+        self.bias    = 0 if size else 2**31 * (self.stride + 1)     # keeps keys positive in unbounded worlds
+        self.offsets = [dy*self.stride + dx for dx, dy in offsets]
+        self.cells   = set()
+        self.walls   = set(self.key(loc) for loc in walls or ())
+        self.touched = 0        # number of cells evaluated in the last step
+
+    def key(self, loc):
+        x, y = loc
+        return y*self.stride + x + self.bias
+
+    def loc(self, key):
+        y, x = divmod(key - self.bias, self.stride)
+        if x > self.stride // 2 and not self.size:
+            x, y = x - self.stride, y + 1
+        return x, y
+
+    def locations(self):
+        """Return set of (x, y) locations of live cells."""
+        return set(self.loc(k) for k in self.cells)
+
+    def randomize(self, density=density, area=None):
+        """Fill `area` ((x1, y1, x2, y2), default: whole field) with random cells."""
+        x1, y1, x2, y2 = area or (0, 0) + tuple(self.size)
+        rnd, key, walls = self.rng.random, self.key, self.walls
+        self.cells.update( k for k in (key((x, y)) for y in range(y1, y2) for x in range(x1, x2))
+                           if rnd() < density and k not in walls )
+
+    def valid(self, key):
+        if not self.size:
+            return True
+        x, y = self.loc(key)
+        return 0 <= x < self.size[0] and 0 <= y < self.size[1]
+
+    def neighbours(self):
+        """Return Counter of live neighbours for all cells next to a live cell."""
+        counts, cells = Counter(), self.cells
+        for offset in self.offsets:
+            counts.update(map(offset.__add__, cells))
+        return counts
+
+    def step(self):
+        fuzzy, survive_min, remove_above, shift = rule_params(self.rule, self.n)
+        cells, rnd = self.cells, self.rng.random
+        counts = self.neighbours()
+        get    = counts.get
+        if remove_above is None:
+            dying = [k for k in cells if not survive_min <= get(k, 0) <= 3]
+        else:
+            dying = [k for k in cells if not survive_min <= get(k, 0) <= 3 and rnd() > remove_above]
+
+        if fuzzy:
+            ranges = dict( (n + shift, r) for n, r in fuzzy_ranges().items() )
+            born   = [k for k, num in counts.items() if num in ranges and k not in cells
+                      and ranges[num][0] < rnd() <= ranges[num][1]]
+        else:
+            born = [k for k, num in counts.items() if num == normal_add + shift and k not in cells]
+
+        if self.size:
+            stride, width, limit = self.stride, self.size[0], self.size[1] * self.stride
+            born = [k for k in born if 0 <= k < limit and k % stride < width]
+        if self.walls:
+            born = [k for k in born if k not in self.walls]
+
+        self.touched = len(counts) + len(cells.difference(counts))
+        cells.difference_update(dying)
+        cells.update(born)
+        self.n += 1
+
+    def run(self, generations):
+        for _ in range(generations):
+            self.step()
+
+    def population(self):
+        return len(self.cells)
+
+
+def benchmark(engine="array", rule="lifend", generations=100, width=1000, height=1000, seed=1):
+    """ Run `generations` of a randomly filled field (sparse engine: only a square in the middle, 1/100 of
+        the width); return cell updates per second. The array engine updates every cell of the field; for
+        the sparse engine only the touched cells (live cells and their neighbours) are counted.
+    """
+    if engine == "array":
+        life = ArrayLife(width, height, rule, seed)
+        life.randomize()
+    else:
+        life = SparseLife((width, height), rule, seed)
+        side = max(1, min(width, height) // 100)
+        x, y = (width - side) // 2, (height - side) // 2
+        life.randomize(area=(x, y, x+side, y+side))
+
+    updates = 0
+    start   = time()
+    for _ in range(generations):
+        life.step()
+        updates += width * height if engine == "array" else life.touched
+    sec  = time() - start
+    rate = updates / sec
+    kind = "cell" if engine == "array" else "touched cell"
+    print("%s %s: %dx%d, %d generations in %.2fs, %.1fM %s updates/s, population %d" %
+          (engine, rule, width, height, generations, sec, rate / 1e6, kind, life.population()))
+    return rate
+
+
+if __name__ == "__main__":
+    args   = sys.argv[1:]
+    engine = args[0] if args else "array"
+    rule   = args[1] if len(args) > 1 else "lifend"
+    nums   = [int(a) for a in args[2:5]]
+    benchmark(engine, rule, *nums)
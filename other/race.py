@@ -8,8 +8,13 @@
 # Your Own Computer Games with Python", chapter 15:
 #   http://inventwithpython.com/chapter15.html
 
-import random, sys, pygame, time, copy
-from pygame.locals import *
+import random, sys, time, copy
+
+try:
+    import pygame
+    from pygame.locals import *
+except ImportError:
+    pygame = None # game logic, AI and benchmark still work without pygame
 
 FPS            = 10
 WINDOWWIDTH    = 640
@@ -22,6 +27,8 @@ BLACK_TILE     = "BLACK_TILE"
 EMPTY_SPACE    = "EMPTY_SPACE"
 HINT_TILE      = "HINT_TILE"
 ANIMATIONSPEED = 25 # integer from 1 to 100, higher is faster animation
+AI_DEPTH       = 1  # plies searched by the computer; 1 picks the move that flips most tiles
+INFINITY       = float('inf')  # initial search window bound; finished games score up to 64x100
 
 XMARGIN = int((WINDOWWIDTH - (BOARDWIDTH * SPACESIZE)) / 2)
 YMARGIN = int((WINDOWHEIGHT - (BOARDHEIGHT * SPACESIZE)) / 2)
@@ -38,6 +45,8 @@ GRIDLINECOLOR = BLACK
 TEXTCOLOR = WHITE
 HINTCOLOR = BROWN
 
+DIRECTIONS = [[0, 1], [1, 1], [1, 0], [1, -1], [0, -1], [-1, -1], [-1, 0], [-1, 1]]
+
 
 def main():
     global MAINCLOCK, DISPLAYSURF, FONT, BIGFONT, BGIMAGE
@@ -329,50 +338,43 @@ def get_new_board():
     return board
 
 
+def get_rays(xstart, ystart):
+    # Returns lists of spaces from xstart, ystart to the edge of the board
+    # in each direction, leaving out lines too short to flip anything.
+    rays = []
+    for xdirection, ydirection in DIRECTIONS:
+        x, y = xstart + xdirection, ystart + ydirection
+        ray = []
+        while is_on_board(x, y):
+            ray.append((x, y))
+            x, y = x + xdirection, y + ydirection
+        if len(ray) > 1:
+            rays.append(ray)
+    return rays
+
+
 def is_valid_move(board, tile, xstart, ystart):
     # Returns False if the player's move is invalid. If it is a valid
     # move, returns a list of spaces of the captured pieces.
-    if board[xstart][ystart] != EMPTY_SPACE or not is_on_board(xstart, ystart):
+    if not is_on_board(xstart, ystart) or board[xstart][ystart] != EMPTY_SPACE:
         return False
 
-    board[xstart][ystart] = tile # temporarily set the tile on the board.
-
-    if tile == WHITE_TILE:
-        other_tile = BLACK_TILE
-    else:
-        other_tile = WHITE_TILE
+    other_tile = get_other_tile(tile)
 
     tiles_to_flip = []
-    # check each of the eight directions:
-    for xdirection, ydirection in [[0, 1], [1, 1], [1, 0], [1, -1], [0, -1], [-1, -1], [-1, 0], [-1, 1]]:
-        x, y = xstart, ystart
-        x += xdirection
-        y += ydirection
-        if is_on_board(x, y) and board[x][y] == other_tile:
-            # The piece belongs to the other player next to our piece.
-            x += xdirection
-            y += ydirection
-            if not is_on_board(x, y):
-                continue
-            while board[x][y] == other_tile:
-                x += xdirection
-                y += ydirection
-                if not is_on_board(x, y):
-                    break # break out of while loop, continue in for loop
-            if not is_on_board(x, y):
-                continue
-            if board[x][y] == tile:
-                # There are pieces to flip over. Go in the reverse
-                # direction until we reach the original space, noting all
-                # the tiles along the way.
-                while True:
-                    x -= xdirection
-                    y -= ydirection
-                    if x == xstart and y == ystart:
-                        break
-                    tiles_to_flip.append([x, y])
-
-    board[xstart][ystart] = EMPTY_SPACE # make space empty
+    # check each of the lines from this space (precomputed in RAYS):
+    for ray in RAYS[xstart][ystart]:
+        x, y = ray[0]
+        if board[x][y] != other_tile:
+            continue
+        # The piece belongs to the other player next to our piece. There
+        # are pieces to flip over if the line of them ends with our piece.
+        for n, (x, y) in enumerate(ray):
+            if board[x][y] != other_tile:
+                if board[x][y] == tile:
+                    tiles_to_flip.extend(ray[:n])
+                break
+
     if len(tiles_to_flip) == 0: # If no tiles flipped, this move is invalid
         return False
     return tiles_to_flip
@@ -398,7 +400,7 @@ def get_valid_moves(board, tile):
 
     for x in range(BOARDWIDTH):
         for y in range(BOARDHEIGHT):
-            if is_valid_move(board, tile, x, y) != False:
+            if board[x][y] == EMPTY_SPACE and is_valid_move(board, tile, x, y) != False:
                 valid_moves.append((x, y))
     return valid_moves
 
@@ -454,9 +456,11 @@ def enter_player_tile():
         MAINCLOCK.tick(FPS)
 
 
-def make_move(board, tile, xstart, ystart, real_move=False):
+def make_move(board, tile, xstart, ystart, real_move=False, scores=None):
     # Place the tile on the board at xstart, ystart, and flip tiles
-    # Returns False if this is an invalid move, True if it is valid.
+    # Returns False if this is an invalid move, or the list of flipped
+    # tiles if it is valid, so that unmake_move() can take it back.
+    # If scores (as from get_score_of_board()) is given, it is updated.
     tiles_to_flip = is_valid_move(board, tile, xstart, ystart)
 
     if tiles_to_flip == False:
@@ -469,7 +473,30 @@ def make_move(board, tile, xstart, ystart, real_move=False):
 
     for x, y in tiles_to_flip:
         board[x][y] = tile
-    return True
+
+    if scores is not None:
+        scores[tile] += len(tiles_to_flip) + 1
+        scores[get_other_tile(tile)] -= len(tiles_to_flip)
+    return tiles_to_flip
+
+
+def unmake_move(board, tile, xstart, ystart, flipped, scores=None):
+    # Take back the move that make_move() made, flipping back the
+    # tiles in the list it returned.
+    other_tile = get_other_tile(tile)
+    board[xstart][ystart] = EMPTY_SPACE
+    for x, y in flipped:
+        board[x][y] = other_tile
+
+    if scores is not None:
+        scores[tile] -= len(flipped) + 1
+        scores[other_tile] += len(flipped)
+
+
+def get_other_tile(tile):
+    if tile == WHITE_TILE:
+        return BLACK_TILE
+    return WHITE_TILE
 
 
 def is_on_corner(x, y):
@@ -480,9 +507,10 @@ def is_on_corner(x, y):
            (x == BOARDWIDTH and y == BOARDHEIGHT)
 
 
-def get_computer_move(board, computer_tile):
+def get_computer_move(board, computer_tile, depth=None):
     # Given a board and the computer's tile, determine where to
-    # move and return that move as a [x, y] list.
+    # move and return that move as a [x, y] list. Moves are tried
+    # on the board itself and taken back.
     possible_moves = get_valid_moves(board, computer_tile)
 
     # randomize the order of the possible moves
@@ -494,17 +522,97 @@ def get_computer_move(board, computer_tile):
             return [x, y]
 
     # Go through all possible moves and remember the best scoring move
-    best_score = -1
+    if depth is None:
+        depth = AI_DEPTH
+    other_tile = get_other_tile(computer_tile)
+    scores = get_score_of_board(board)
+    best_score = None
     for x, y in possible_moves:
-        dupe_board = copy.deepcopy(board)
-        make_move(dupe_board, computer_tile, x, y)
-        score = get_score_of_board(dupe_board)[computer_tile]
-        if score > best_score:
+        flipped = make_move(board, computer_tile, x, y, scores=scores)
+        score = -minimax(board, other_tile, depth - 1, scores)
+        unmake_move(board, computer_tile, x, y, flipped, scores)
+        if best_score is None or score > best_score:
             best_move = [x, y]
             best_score = score
     return best_move
 
 
+def minimax(board, tile, depth, scores, alpha=-INFINITY, beta=INFINITY):
+    # Returns the value of the board for tile to move: the difference
+    # in tile counts after depth moves, each side making its best move
+    # (negamax with alpha-beta pruning). A finished game counts x100.
+    other_tile = get_other_tile(tile)
+    if depth <= 0:
+        return scores[tile] - scores[other_tile]
+
+    moves = get_valid_moves(board, tile)
+    if moves == []:
+        if get_valid_moves(board, other_tile) == []:
+            return (scores[tile] - scores[other_tile]) * 100
+        # pass the turn
+        return -minimax(board, other_tile, depth - 1, scores, -beta, -alpha)
+
+    for x, y in moves:
+        flipped = make_move(board, tile, x, y, scores=scores)
+        value = -minimax(board, other_tile, depth - 1, scores, -beta, -alpha)
+        unmake_move(board, tile, x, y, flipped, scores)
+        if value > alpha:
+            alpha = value
+            if alpha >= beta:
+                break
+    return alpha
+
+
+def benchmark(positions=200, depth=3):
+    # Evaluates all moves in random positions by copying the board and
+    # by make/unmake, and prints the number of moves per second.
+    boards = []
+    tile = WHITE_TILE
+    while len(boards) < positions:
+        board = get_new_board()
+        reset_board(board)
+        for i in range(random.randint(0, 50)):
+            if get_valid_moves(board, tile) == []:
+                tile = get_other_tile(tile)
+            moves = get_valid_moves(board, tile)
+            if moves == []:
+                break
+            make_move(board, tile, *random.choice(moves))
+            tile = get_other_tile(tile)
+        if get_valid_moves(board, tile) != []:
+            boards.append((board, tile))
+
+    start = time.time()
+    count = 0
+    for board, tile in boards:
+        for x, y in get_valid_moves(board, tile):
+            dupe_board = copy.deepcopy(board)
+            make_move(dupe_board, tile, x, y)
+            get_score_of_board(dupe_board)[tile]
+            count += 1
+    copy_rate = count / (time.time() - start)
+
+    start = time.time()
+    for board, tile in boards:
+        scores = get_score_of_board(board)
+        for x, y in get_valid_moves(board, tile):
+            flipped = make_move(board, tile, x, y, scores=scores)
+            scores[tile]
+            unmake_move(board, tile, x, y, flipped, scores)
+    undo_rate = count / (time.time() - start)
+
+    start = time.time()
+    searched = boards[:20]
+    for board, tile in searched:
+        get_computer_move(board, tile, depth)
+    search_time = (time.time() - start) / len(searched)
+
+    print("%d moves in %d positions" % (count, len(boards)))
+    print("deepcopy:    %8.0f moves/s" % copy_rate)
+    print("make/unmake: %8.0f moves/s (%.1fx)" % (undo_rate, undo_rate / copy_rate))
+    print("depth %d search: %.1fms per move" % (depth, search_time * 1000))
+
+
 def check_for_quit():
     for event in pygame.event.get((QUIT, KEYUP)): # event handling loop
         if event.type == QUIT or (event.type == KEYUP and event.key == K_ESCAPE):
@@ -512,5 +620,10 @@ def check_for_quit():
             sys.exit()
 
 
+RAYS = [[get_rays(x, y) for y in range(BOARDHEIGHT)] for x in range(BOARDWIDTH)]
+
 if __name__ == "__main__":
-    main()
+    if sys.argv[1:2] == ["bench"]:
+        benchmark(*[int(a) for a in sys.argv[2:4]])
+    else:
+        main()
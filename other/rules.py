@@ -3,7 +3,7 @@ from things import Thing
 
 
 class Rules(object):
-    """Rulesets for game of life."""
+    """Rulesets for game of life; see life.py for the same rules on whole arrays or sparse sets of cells."""
     n = 1
     add = 3
 
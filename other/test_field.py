@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+
+""" Tests for `field.Field`: generation-stamped clear and copy-on-write snapshots.
+
+    `shared` (the helpers main.py and field.py import) is not in this directory, so a minimal stand-in
+    providing the names field.py uses is installed before the import.
+
+    usage: python -m unittest test_field
+"""
+
+import sys
+import types
+import unittest
+from collections import namedtuple
+
+if "shared" not in sys.modules:
+    shared = types.ModuleType("shared")
+
+    class Location(namedtuple("Location", "x y")):
+        def __new__(cls, x, y=None):
+            x, y = shared.unwrap(x, y)
+            return super(Location, cls).__new__(cls, x, y)
+
+    def unwrap(x, y=None):
+        return (x, y) if y is not None else tuple(x)
+
+    def joinst(seq, sep=' '):
+        return sep.join(str(x) for x in seq)
+
+    shared.Location, shared.unwrap, shared.joinst = Location, unwrap, joinst
+    shared.__all__  = ["Location", "unwrap", "joinst"]
+    sys.modules["shared"] = shared
+
+import field
+from field import Field, Location, wall
+
+
+class FieldTest(unittest.TestCase):
+    def setUp(self):
+        self.fld = Field()
+
+    def test_init_walls(self):
+        fld = self.fld
+        self.assertEqual(fld.used, fld.size)
+        self.assertEqual(fld.value(3, 4), wall)
+        self.assertFalse(fld.is_empty())
+
+    def test_clear(self):
+        fld = self.fld
+        fld.clear()
+        self.assertTrue(fld.is_empty())
+        self.assertEqual(fld.values(Location(3, 4)), field.blank)
+        self.assertTrue(fld.empty(Location(3, 4)))
+
+        fld.put('x', Location(3, 4))
+        self.assertEqual(fld.value(3, 4), 'x')
+        self.assertEqual(fld.used, 1)
+        fld.remove('x', Location(3, 4))
+        self.assertTrue(fld.is_empty())
+        self.assertEqual(field.blank, (' ',))
+
+    def test_rollback(self):
+        fld  = self.fld
+        snap = fld.snapshot()
+        fld.remove(wall, Location(1, 1))
+        fld.put('x', Location(2, 1))
+        self.assertTrue(fld.empty(Location(1, 1)))
+
+        fld.rollback(snap)
+        self.assertEqual(fld.values(1, 1), [' ', wall])
+        self.assertEqual(fld.values(2, 1), [' ', wall])
+        self.assertEqual(fld.used, fld.size)
+        self.assertEqual(fld.snapshots, [])
+
+    def test_rollback_clear(self):
+        fld  = self.fld
+        snap = fld.snapshot()
+        fld.clear()
+        fld.put('x', Location(0, 0))
+        fld.rollback(snap)
+        self.assertEqual(fld.values(0, 0), [' ', wall])
+        self.assertEqual(fld.used, fld.size)
+
+    def test_nested_commit(self):
+        fld   = self.fld
+        outer = fld.snapshot()
+        fld.remove(wall, Location(1, 1))
+        inner = fld.snapshot()
+        fld.remove(wall, Location(2, 2))
+        fld.commit(inner)
+        self.assertTrue(fld.empty(Location(2, 2)))
+
+        fld.rollback(outer)
+        self.assertEqual(fld.value(1, 1), wall)
+        self.assertEqual(fld.value(2, 2), wall)
+        self.assertEqual(fld.used, fld.size)
+
+    def test_nested_rollback(self):
+        fld   = self.fld
+        outer = fld.snapshot()
+        fld.remove(wall, Location(1, 1))
+        fld.snapshot()
+        fld.remove(wall, Location(2, 2))
+        fld.rollback()
+        self.assertTrue(fld.empty(Location(1, 1)))
+        self.assertEqual(fld.value(2, 2), wall)
+
+        fld.commit(outer)
+        self.assertTrue(fld.empty(Location(1, 1)))
+        self.assertEqual(fld.snapshots, [])
+
+    def test_move(self):
+        fld = self.fld
+        fld.clear()
+        thing = types.SimpleNamespace(loc=Location(5, 5))
+        fld.put(thing)
+        snap = fld.snapshot()
+        self.assertEqual(fld.move(0, thing), (6, 5))
+        self.assertEqual(fld.value(6, 5), thing)
+
+        fld.rollback(snap)
+        self.assertEqual(fld.value(5, 5), thing)
+        self.assertTrue(fld.empty(Location(6, 5)))
+
+
+if __name__ == "__main__":
+    unittest.main()